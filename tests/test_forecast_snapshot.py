@@ -0,0 +1,91 @@
+import io
+import math
+import pytest
+from forecast_snapshot import load_snapshot, read_snapshot, write_snapshot
+from hourly_forecast_columns import COLUMN_TYPES, HourlyForecastColumns
+
+
+def _rows():
+    return [
+        {"forecast_period": 1, "start_time": "2026-10-17T06:00:00-04:00", "temperature": 50,
+         "temperature_unit": "F", "dewpoint_value": 10, "dewpoint_unit": "wmoUnit:degC",
+         "relative_humidity_value": 80, "precipitation_probability_value": 20, "wind_speed": "5 to 10 mph",
+         "wind_direction": "NW", "weather_icon_url": "https://api.weather.gov/icons/land/day/rain,20?size=small",
+         "short_forecast": "Chance Rain Showers"},
+        {"forecast_period": 2, "start_time": "2026-10-17T07:00:00-04:00", "temperature": None,
+         "temperature_unit": "F", "wind_speed": "", "wind_direction": "NW", "short_forecast": "Cloudy ☁"},
+    ]
+
+
+def _snapshot_bytes(metadata=None):
+    data = io.BytesIO()
+    write_snapshot(data, HourlyForecastColumns.from_rows(_rows()), metadata)
+    return data.getvalue()
+
+
+def _same_columns(loaded, original):
+    for name, _ in COLUMN_TYPES:
+        assert [repr(value) for value in getattr(loaded, name)] == [repr(value) for value in getattr(original, name)]
+    assert loaded.strings() == original.strings()
+
+
+def test_round_trip(tmp_path):
+    original = HourlyForecastColumns.from_rows(_rows())
+    path = tmp_path / "hourly.snapshot"
+    with open(path, "wb") as snapshot_file:
+        write_snapshot(snapshot_file, original, {"generation_time": "2026-10-17T05:00:00+00:00"})
+
+    columns, metadata = load_snapshot(str(path))
+    _same_columns(columns, original)
+    assert metadata == {"generation_time": "2026-10-17T05:00:00+00:00"}
+    assert math.isnan(columns.temperature[1])
+    assert columns.row(0) == original.row(0)
+    assert columns.text("short_forecast", 1) == "Cloudy ☁"
+
+
+def test_round_trip_of_empty_columns():
+    data = io.BytesIO()
+    write_snapshot(data, HourlyForecastColumns())
+    columns, metadata = read_snapshot(memoryview(data.getvalue()))
+    assert len(columns) == 0
+    assert metadata == {}
+
+
+def test_loaded_columns_can_be_extended(tmp_path):
+    path = tmp_path / "hourly.snapshot"
+    path.write_bytes(_snapshot_bytes())
+    columns, _ = load_snapshot(str(path))
+    columns.extend([{"start_time": "2026-10-17T08:00:00-04:00", "short_forecast": "Sunny"}])
+    assert len(columns) == 3
+    assert columns.text("short_forecast", 2) == "Sunny"
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.snapshot"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError, match="not a forecast snapshot"):
+        load_snapshot(str(path))
+
+
+def test_not_a_snapshot():
+    with pytest.raises(ValueError, match="not a forecast snapshot"):
+        read_snapshot(memoryview(b"hour,temperature\n" * 4))
+
+
+def test_every_truncation(tmp_path):
+    data = _snapshot_bytes({"generation_time": "2026-10-17T05:00:00+00:00"})
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            read_snapshot(memoryview(data[:length]))
+
+    path = tmp_path / "truncated.snapshot"
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(ValueError, match="truncated forecast snapshot"):
+        load_snapshot(str(path))
+
+
+def test_corrupt_metadata():
+    data = bytearray(_snapshot_bytes({"generation_time": "2026-10-17T05:00:00+00:00"}))
+    data[24] = ord("}")
+    with pytest.raises(ValueError, match="metadata"):
+        read_snapshot(memoryview(bytes(data)))
@@ -0,0 +1,81 @@
+import json
+import pytest
+from forecast_stream import PeriodStreamParser, parse_periods
+
+GEOMETRY = {"type": "Polygon", "coordinates": [[[-78.6, 35.7], [-78.6, 35.8], [-78.7, 35.8], [-78.6, 35.7]]]}
+PERIODS = [
+    {"number": 1, "startTime": "2026-10-17T06:00:00-04:00", "temperature": 50, "shortForecast": "Sunny"},
+    {"number": 2, "startTime": "2026-10-17T07:00:00-04:00", "temperature": -3.5,
+     "shortForecast": "Snow ❄ and \"wind\" [gusts]", "windSpeed": "5 to 10 mph"},
+    {"number": 3, "startTime": "2026-10-17T08:00:00-04:00", "temperature": None, "shortForecast": "Müggy, {hot}"},
+]
+
+
+def _response():
+    document = {"type": "Feature", "geometry": GEOMETRY,
+                "properties": {"generatedAt": "2026-10-17T05:12:00+00:00", "periods": PERIODS}}
+    return json.dumps(document, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _parse(chunks):
+    parser = PeriodStreamParser()
+    periods = []
+    for chunk in chunks:
+        periods.extend(parser.feed(chunk))
+    parser.close()
+    return parser, periods
+
+
+def test_whole_response():
+    parser, periods = _parse([_response()])
+    assert periods == PERIODS
+    assert parser.count == len(PERIODS)
+    assert parser.generated_at == "2026-10-17T05:12:00+00:00"
+    assert parser.geometry == GEOMETRY
+
+
+def test_every_split_point():
+    # Splits inside keys, numbers, escaped quotes and multibyte UTF-8 characters all give the same periods
+    data = _response()
+    for split in range(1, len(data)):
+        parser, periods = _parse([data[:split], data[split:]])
+        assert periods == PERIODS, split
+        assert parser.generated_at == "2026-10-17T05:12:00+00:00"
+        assert parser.geometry == GEOMETRY
+
+
+def test_one_byte_at_a_time():
+    data = _response()
+    parser, periods = _parse(data[index:index + 1] for index in range(len(data)))
+    assert periods == PERIODS
+    assert parser.geometry == GEOMETRY
+
+
+def test_periods_arrive_as_they_complete():
+    data = _response()
+    end_of_first = data.index(b"}", data.index(b'"periods"')) + 1
+    parser = PeriodStreamParser()
+    assert parser.feed(data[:end_of_first - 1]) == []
+    assert parser.feed(data[end_of_first - 1:end_of_first]) == PERIODS[:1]
+    assert parser.feed(data[end_of_first:]) == PERIODS[1:]
+    parser.close()
+
+
+def test_generated_at_after_the_periods():
+    data = json.dumps({"properties": {"periods": PERIODS, "generatedAt": "2026-10-17T05:12:00+00:00"}})
+    parser = parse_periods([data.encode("utf-8")], lambda periods, parser: None)
+    assert parser.generated_at == "2026-10-17T05:12:00+00:00"
+    assert parser.geometry is None
+
+
+def test_truncated_response():
+    data = _response()
+    parser = PeriodStreamParser()
+    parser.feed(data[:len(data) // 2])
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_response_without_periods():
+    with pytest.raises(ValueError):
+        parse_periods([b'{"status": 500, "detail": "Unexpected Problem"}'], lambda periods, parser: None)
@@ -0,0 +1,60 @@
+import time
+from datetime import datetime
+import pytest
+from iso_time import date_label, format_iso, hour_label, local_offset, parse_iso, to_epoch
+
+
+@pytest.mark.parametrize("text", [
+    "2026-10-17T06:00:00-04:00",
+    "2026-10-17T23:59:59+00:00",
+    "2026-01-01T00:00:00+05:30",
+    "2026-03-08T02:30:15-10:00",
+    "2024-02-29T12:00:00+14:00",
+    "1970-01-01T00:00:00+00:00",
+    "2026-12-31T18:45:00-03:30",
+])
+def test_fast_path_matches_fromisoformat(text):
+    expected = datetime.fromisoformat(text)
+    assert parse_iso(text) == (int(expected.timestamp()), int(expected.utcoffset().total_seconds()))
+    assert format_iso(*parse_iso(text)) == text
+
+
+@pytest.mark.parametrize("text", [
+    "2026-10-17T24:00:00-04:00",
+    "2026-10-17T06:60:00-04:00",
+    "2026-10-17T06:00:60-04:00",
+    "2026-02-30T06:00:00-04:00",
+    "2026-1a-17T06:00:00-04:00",
+    "not a time",
+    "",
+    None,
+])
+def test_invalid_times(text):
+    assert parse_iso(text) is None
+    assert to_epoch(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "2026-10-17T06:00:00Z",
+    "2026-10-17T06:00:00.500000-04:00",
+    "2026-10-17T06:00-04:00",
+])
+def test_other_shapes_fall_back(text):
+    expected = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    assert parse_iso(text) == (int(expected.timestamp()), int(expected.utcoffset().total_seconds()))
+
+
+def test_naive_time_is_local():
+    epoch, offset = parse_iso("2026-10-17T06:00:00")
+    assert epoch == int(time.mktime((2026, 10, 17, 6, 0, 0, 0, 0, -1)))
+    assert offset == local_offset(epoch)
+    assert hour_label(epoch, offset) == "06:00 AM"
+
+
+def test_labels():
+    epoch, offset = parse_iso("2026-10-17T15:30:00-04:00")
+    assert date_label(epoch, offset) == "Saturday, Oct 17"
+    assert hour_label(epoch, offset) == "03:30 PM"
+    # Just after midnight UTC is still the previous day in the forecast's offset
+    epoch, offset = parse_iso("2026-10-17T21:00:00-04:00")
+    assert date_label(epoch, offset) == "Saturday, Oct 17"
@@ -0,0 +1,47 @@
+"""
+Atomic writes of the cache files: the data goes to a new, uniquely named temporary file next to the target,
+which then replaces it with os.replace(). A reader never sees a half written file, a crash never leaves one
+behind, and two writers of the same file (even in the same thread) never share a temporary file.
+"""
+import json
+import os
+import tempfile
+
+
+def temp_file(path):
+    """
+    Opens a new temporary file next to path for writing bytes; returns (file, temp path).
+    Replace path with it (os.replace()) once it is complete, or remove it.
+    """
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                             suffix=".tmp")
+    return os.fdopen(descriptor, "wb"), temp_path
+
+
+def write_atomic(path, data):
+    """Replaces the file at path with data (bytes). Raises OSError if it can't be written."""
+    new_file, temp_path = temp_file(path)
+    try:
+        with new_file:
+            new_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_json(path, default=None):
+    """Returns the JSON data of a file, or default if it is missing or can't be parsed."""
+    try:
+        with open(path, "r", encoding="utf-8") as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Replaces a JSON file with data (see write_atomic())."""
+    write_atomic(path, json.dumps(data).encode("utf-8"))
@@ -0,0 +1,160 @@
+import json
+import random
+import sys
+import time
+from geopy.exc import GeocoderRateLimited, GeocoderServiceError, GeocoderTimedOut, GeocoderUnavailable
+from geocode_cache import location_from_dict, location_to_dict, normalize_query
+from rate_limiter import RateLimiter
+
+
+class GeocodeResult:
+    """The outcome of geocoding one query in a batch. location is None if the query wasn't found."""
+
+    def __init__(self, query, location=None, error=None):
+        self.query = query
+        self.location = location
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def __str__(self):
+        if not self.success:
+            status = f"failed: {self.error}"
+        elif self.location is None:
+            status = "not found"
+        else:
+            status = f"'{self.location.address}' ({self.location.latitude}, {self.location.longitude})"
+        return f"GeocodeResult(query='{self.query}', {status})"
+
+
+class BatchGeocoder:
+    """
+    Geocodes a long list of queries, e.g. the addresses of a site list.
+
+    Queries are deduplicated by their normalized form (see geocode_cache.normalize_query) and cached queries
+    don't reach the geocoder. Requests to the geocoder go through a token bucket, and are retried with
+    exponential backoff when the geocoder is rate limiting (429), unavailable (5xx) or timed out.
+
+    With a checkpoint file, every finished query is appended to it as a JSON line. A batch started again with
+    the same file answers the queries already in it from the file, so it carries on where it stopped.
+    Queries that failed are tried again.
+    """
+
+    def __init__(self, geo_service=None, requests_per_second=1.0, burst=1, max_retries=4, backoff=2.0,
+                 max_backoff=60.0, checkpoint_file=None, sleep=time.sleep):
+        if geo_service is None:
+            from geolocator import GeolocatorService
+            geo_service = GeolocatorService()
+        self._geo_service = geo_service
+        self._rate_limiter = RateLimiter(requests_per_second, burst)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._checkpoint_file = checkpoint_file
+        self._sleep = sleep
+
+    def geocode(self, queries):
+        """
+        Geocodes an iterable of query strings.
+        This is a generator: a GeocodeResult is yielded for each query (duplicates included) as soon as it
+        is done, in input order. The queries are read lazily, so they can come from a large file.
+        """
+        finished = self._load_checkpoint()
+        checkpoint = open(self._checkpoint_file, "a", encoding="utf-8") if self._checkpoint_file else None
+        try:
+            for query in queries:
+                key = normalize_query(query)
+                if key in finished:
+                    yield GeocodeResult(query, *finished[key])
+                    continue
+
+                try:
+                    location, error = self._geocode(query), None
+                except Exception as e:
+                    location, error = None, e
+
+                if error is None:
+                    finished[key] = (location, None)
+                    if checkpoint:
+                        self._write_checkpoint(checkpoint, key, location)
+                yield GeocodeResult(query, location, error)
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+    def _geocode(self, query):
+        # Looks a query up, waiting for a token before each request to the geocoder and retrying transient errors
+        location = self._geo_service.get_cached_location(query)
+        if location is not None:
+            return location
+
+        attempt = 0
+        while True:
+            self._rate_limiter.acquire()
+            try:
+                # The results are kept in the checkpoint file, so they aren't written to the cache one by one
+                return self._geo_service.lookup(query, store=False)
+            except GeocoderServiceError as e:
+                if attempt >= self._max_retries or not _is_transient(e):
+                    raise
+                self._sleep(self._retry_delay(e, attempt))
+                attempt += 1
+
+    def _retry_delay(self, error, attempt):
+        # A 429 may say how long to wait; otherwise back off exponentially, with jitter
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return min(self._max_backoff, retry_after)
+        delay = min(self._max_backoff, self._backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _load_checkpoint(self):
+        # Returns normalized query -> (location, None) of the queries finished in an earlier run
+        finished = {}
+        if not self._checkpoint_file:
+            return finished
+        try:
+            with open(self._checkpoint_file, "r", encoding="utf-8") as checkpoint:
+                for line in checkpoint:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut off by a crash; that query is simply done again
+                        continue
+                    location = entry["location"]
+                    finished[entry["query"]] = (location_from_dict(location) if location else None, None)
+        except OSError:
+            pass
+        return finished
+
+    @staticmethod
+    def _write_checkpoint(checkpoint, key, location):
+        entry = {"query": key, "location": location_to_dict(location) if location else None}
+        checkpoint.write(json.dumps(entry) + "\n")
+        checkpoint.flush()
+
+
+def _is_transient(error):
+    # 429, 503 and 504 have their own exception types; other 5xx responses are raised as a plain
+    # GeocoderServiceError, while client errors (400, 403, ...) are subclasses of it that aren't retried
+    return isinstance(error, (GeocoderRateLimited, GeocoderUnavailable, GeocoderTimedOut)) \
+        or type(error) is GeocoderServiceError
+
+
+def main():
+    # Geocodes the queries in a text file (one per line), checkpointing to <file>.checkpoint.jsonl
+    if len(sys.argv) != 2:
+        print("usage: batch_geocoder.py <file with one query per line>")
+        return
+
+    with open(sys.argv[1], "r", encoding="utf-8") as query_file:
+        queries = (line.strip() for line in query_file if line.strip())
+        geocoder = BatchGeocoder(checkpoint_file=f"{sys.argv[1]}.checkpoint.jsonl")
+        for result in geocoder.geocode(queries):
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
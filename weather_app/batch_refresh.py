@@ -0,0 +1,148 @@
+import asyncio
+import json
+import aiohttp
+from concurrent.futures import wait, FIRST_COMPLETED
+from forecast_client import AsyncForecastClient, ForecastClientLoop
+from gridpoint_cache import grid_cell_key
+from rate_limiter import RateLimiter
+
+# The errors that fail one location of a batch instead of the whole batch
+_FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError, KeyError, TypeError, ValueError)
+
+
+class BatchResult:
+    """The outcome of refreshing one location in a batch."""
+
+    def __init__(self, location, gridpoint=None, daily_forecast_data=None, hourly_forecast_data=None, error=None):
+        self.location = location
+        self.gridpoint = gridpoint
+        self.daily_forecast_data = daily_forecast_data
+        self.hourly_forecast_data = hourly_forecast_data
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def __str__(self):
+        status = "ok" if self.success else f"failed: {self.error}"
+        return f"BatchResult(location='{self.location.address}', {status})"
+
+
+class BatchRefreshEngine:
+    """
+    Refreshes the forecasts of many locations at once without a GUI.
+
+    Locations are fetched with the same AsyncForecastClient as the GUI, on a ForecastClientLoop of the engine
+    with at most max_workers connections, and every request to the API goes through one shared rate limit.
+    Locations that round to the same coordinate, or that resolve to the same NWS grid cell, are only fetched once.
+    Call close() when done with the engine.
+    """
+
+    def __init__(self, max_workers=8, requests_per_second=5.0, burst=5, client_loop=None):
+        if client_loop is None:
+            rate_limiter = RateLimiter(requests_per_second, burst)
+            client_loop = ForecastClientLoop(AsyncForecastClient(max_connections=max_workers,
+                                                                 rate_limiter=rate_limiter))
+            self._owns_client_loop = True
+        else:
+            self._owns_client_loop = False
+        self._client_loop = client_loop
+
+    def refresh(self, locations):
+        """
+        Fetches the forecasts of a list of geopy Locations.
+        This is a generator: a BatchResult is yielded for each location as soon as its grid cell is done,
+        in completion order rather than input order.
+        """
+        pending = {}          # future -> ("lookup", coordinate) or ("cell", grid cell key)
+        try:
+            yield from self._run(pending, locations)
+        finally:
+            # Stop the requests still running if the results aren't wanted anymore
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        """Closes the connections of the engine's client loop (not of one it was given)."""
+        if self._owns_client_loop:
+            self._client_loop.close()
+
+    def _run(self, pending, locations):
+        submit = self._client_loop.submit
+        coordinates = {}      # rounded coordinate -> locations that share it
+        cell_coordinates = {} # grid cell key -> coordinates that resolved to it
+        finished_cells = {}   # grid cell key -> (gridpoint, daily data, hourly data, error)
+
+        # Step 1: look up the gridpoint of every distinct coordinate
+        for location in locations:
+            coordinate = (round(location.latitude, 4), round(location.longitude, 4))
+            if coordinate not in coordinates:
+                coordinates[coordinate] = []
+                # submit() creates the coroutine right away, so the lambdas see the current values
+                pending[submit(lambda client: client.lookup_gridpoint(*coordinate))] = ("lookup", coordinate)
+            coordinates[coordinate].append(location)
+
+        # Step 2: fetch each grid cell once, as soon as the first coordinate in it has been looked up
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, key = pending.pop(future)
+
+                if kind == "lookup":
+                    try:
+                        gridpoint, from_cache = future.result()
+                    except _FETCH_ERRORS as e:
+                        yield from self._results(coordinates[key], error=e)
+                        continue
+
+                    cell = grid_cell_key(gridpoint)
+                    if cell in finished_cells:
+                        yield from self._results(coordinates[key], *finished_cells[cell])
+                    elif cell in cell_coordinates:
+                        cell_coordinates[cell].append(key)
+                    else:
+                        cell_coordinates[cell] = [key]
+                        cell_future = submit(lambda client: client.fetch_gridpoint(*key, gridpoint, from_cache))
+                        pending[cell_future] = ("cell", cell)
+
+                else:
+                    try:
+                        gridpoint, daily_forecast_data, hourly_forecast_data = future.result()
+                        finished_cells[key] = (gridpoint, daily_forecast_data, hourly_forecast_data, None)
+                    except _FETCH_ERRORS as e:
+                        finished_cells[key] = (None, None, None, e)
+                    for coordinate in cell_coordinates.pop(key):
+                        yield from self._results(coordinates[coordinate], *finished_cells[key])
+
+    @staticmethod
+    def _results(locations, gridpoint=None, daily_forecast_data=None, hourly_forecast_data=None, error=None):
+        for location in locations:
+            yield BatchResult(location, gridpoint, daily_forecast_data, hourly_forecast_data, error)
+
+    def get_cache_stats(self):
+        """Returns the hit / miss / revalidation counters of the HTTP cache."""
+        return self._client_loop.client.get_cache_stats()
+
+
+def main():
+    from geopy.location import Location
+
+    # Two dummy locations in the same grid cell and one elsewhere
+    locations = [
+        Location("New York", (40.71282, -74.00603), {}),
+        Location("New York City Hall", (40.71275, -74.00596), {}),
+        Location("Chicago", (41.87811, -87.62980), {}),
+    ]
+
+    engine = BatchRefreshEngine(max_workers=4, requests_per_second=2)
+    try:
+        for result in engine.refresh(locations):
+            print(result)
+        print(json.dumps(engine.get_cache_stats()))
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
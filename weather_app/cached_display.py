@@ -0,0 +1,25 @@
+class cached_display:
+    """
+    A read-only property for display strings of a forecast record with __slots__.
+
+    The string is computed the first time it is read and then kept in the slot named "_" + the property name,
+    which the class must declare. Records that are never shown never pay for formatting.
+    """
+
+    def __init__(self, compute):
+        self._compute = compute
+        self._slot = None
+        self.__doc__ = compute.__doc__
+
+    def __set_name__(self, owner, name):
+        self._slot = f"_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self._slot)
+        except AttributeError:
+            value = self._compute(instance)
+            setattr(instance, self._slot, value)
+            return value
@@ -1,13 +1,7 @@
-#function for converting Fahrenheit to Celsius(takes a float and returns a float)
-def fahrenheit_to_celsius(fahrenheit):
-    celsius = (fahrenheit - 32) * 5 / 9
-    return celsius
-
-
-#function for converting Celsius to Fahrenheit (takes a float and returns a float)
-def celsius_to_fahrenheit(celsius):
-    fahrenheit = (celsius * 9 / 5) + 32
-    return fahrenheit
+import math
+from cached_display import cached_display
+#the conversion functions are shared with the hourly forecast and the column loaders
+from unit_conversion import fahrenheit_to_celsius, celsius_to_fahrenheit, parse_number, unit_letter
 
 """
 The daily forecast class for a single period of the day (e.g., Monday Night, Tuesday Afternoon, etc.).
@@ -17,65 +11,71 @@ The class should contain:
     - the chance of rain
     - an icon URL
     - a detailed forecast string
+
+The object holds the raw values (NaN for a missing number) and builds the display strings used by the ui
+the first time they are read.
 """
 #define a daily forecast class
 class DailyForecast:
-    #define the constructor
-    def __init__(self, period_name, temperature_fahrenheit, temperature_celsius, chance_of_rain, icon_url, detailed_forecast):
-        self._period_name = period_name
-        self._temperature_fahrenheit = temperature_fahrenheit
-        self._temperature_celsius = temperature_celsius
-        self._chance_of_rain = chance_of_rain
-        self._icon_url = icon_url
-        self._detailed_forecast = detailed_forecast
-
+    __slots__ = ("period_name", "start_time", "temperature", "temperature_unit", "precipitation_probability",
+                 "icon_url", "detailed_forecast",
+                 # caches of the display strings
+                 "_temperature_fahrenheit", "_temperature_celsius", "_chance_of_rain")
 
-    #creates a function that is passed a dictionary and turns the entries into daily forecast objects
-    @staticmethod
-    def entry_to_forecast_objects(data: dict):
-        temp_str = str(data.get("temperature", "")).strip() if data.get("temperature") else "" #formats temperature
-        unit = data.get("temperature_unit", "").strip().upper() #For the temperature units, make sure to string extra spaces and capitalize the letter (C or F)
+    #define the constructor
+    def __init__(self, period_name, start_time, temperature, temperature_unit, precipitation_probability, icon_url,
+                 detailed_forecast):
+        self.period_name = period_name
+        self.start_time = start_time
+        self.temperature = temperature
+        self.temperature_unit = temperature_unit
+        self.precipitation_probability = precipitation_probability
+        self.icon_url = icon_url
+        self.detailed_forecast = detailed_forecast
 
-        #If either the temperature value or unit is empty, set the values to "N/A"
-        temperature_display = "N/A"
-        temperature_fahrenheit = "N/A"
-        temperature_celsius = "N/A"
+    #display strings used by the ui
 
-        if temp_str and unit in ("C", "F"):
-            try:
-                temp = float(temp_str)
-                if unit == "F":
-                    temperature_fahrenheit = temp
-                    temperature_celsius = fahrenheit_to_celsius(temp)
-                    temperature_display = f"{temperature_fahrenheit:.1f}°F ({temperature_celsius:.1f}°C)"
-                else:
-                    temperature_celsius = temp
-                    temperature_fahrenheit = celsius_to_fahrenheit(temp)
-                    temperature_display = f"{temperature_celsius:.1f}°C ({temperature_fahrenheit:.1f}°F)"
-            except ValueError:
-                print(f"Invalid value: {temp_str}")
+    #the temperature in its own unit followed by the other one, e.g. "80.0°F (26.7°C)"
+    #If either the temperature value or unit is empty, set the value to "N/A"
+    @cached_display
+    def temperature_fahrenheit(self):
+        if math.isnan(self.temperature) or self.temperature_unit not in ("C", "F"):
+            return "N/A"
+        if self.temperature_unit == "F":
+            return f"{self.temperature:.1f}°F ({fahrenheit_to_celsius(self.temperature):.1f}°C)"
+        return f"{self.temperature:.1f}°C ({celsius_to_fahrenheit(self.temperature):.1f}°F)"
 
-        #formats precipitation
-        precip_str = str(data.get("precipitation_probability_value", "")).strip()
+    @cached_display
+    def temperature_celsius(self):
+        if math.isnan(self.temperature) or self.temperature_unit not in ("C", "F"):
+            return "N/A"
+        celsius = self.temperature if self.temperature_unit == "C" else fahrenheit_to_celsius(self.temperature)
+        return f"{celsius:.1f}°C"
 
-        # make sure to strip additional spaces, if it isn't populated, set to 0
-        # then format in the following manner: "💧chance%" (copy and paste the icon)
-        try:
-            chance_of_rain = f"💧{precip_str}%" if precip_str.isdigit() else "💧 0%"
-        except ValueError:
-                chance_of_rain = "💧 0%"
+    #if the chance of rain isn't populated, set to 0
+    #then format in the following manner: "💧chance%" (copy and paste the icon)
+    @cached_display
+    def chance_of_rain(self):
+        if math.isnan(self.precipitation_probability):
+            return "💧 0%"
+        return f"💧{int(self.precipitation_probability)}%"
 
-        #Extract rest of data
-        period_name = data.get("name", "N/A")
-        icon_url = data.get("weather_icon_url", "N/A")
-        detailed_forecast = data.get("detailed_forecast", "N/A")
+    #creates a function that is passed a dictionary and turns the entries into daily forecast objects
+    @staticmethod
+    def entry_to_forecast_objects(data: dict):
+        #For the temperature units, make sure to strip extra spaces and capitalize the letter (C or F)
+        temperature = parse_number(data.get("temperature"))
+        unit = unit_letter(data.get("temperature_unit"))
+        if math.isnan(temperature) and data.get("temperature") not in (None, ""):
+            print(f"Invalid value: {data.get('temperature')}")
 
         #return a daily forecast object with the data pulled from the dictionary
         return DailyForecast(
-            period_name = period_name,
-            temperature_fahrenheit = temperature_display,
-            temperature_celsius = "N/A",
-            chance_of_rain = chance_of_rain,
-            icon_url = icon_url,
-            detailed_forecast = detailed_forecast
+            period_name = data.get("name", "N/A"),
+            start_time = data.get("start_time"),
+            temperature = temperature,
+            temperature_unit = unit,
+            precipitation_probability = parse_number(data.get("precipitation_probability_value")),
+            icon_url = data.get("weather_icon_url", "N/A"),
+            detailed_forecast = data.get("detailed_forecast", "N/A")
         )
@@ -1,6 +1,6 @@
 import csv
-from datetime import datetime
 from daily_forecast_class import DailyForecast
+from iso_time import hour_label, local_offset, to_epoch
 
 
 """
@@ -20,6 +20,13 @@ class DailyForecastManager:
         self._generation_time = generation_time
         self._forecasts = []
 
+    #builds a manager straight from forecast rows (see forecast_rows.py) without reading a csv file
+    @classmethod
+    def from_rows(cls, rows, generation_time):
+        manager = cls(None, generation_time)
+        manager._forecasts = [DailyForecast.entry_to_forecast_objects(row) for row in rows]
+        return manager
+
     #a function to load forecasts
     def load_forecast(self):
         try:
@@ -36,6 +43,9 @@ class DailyForecastManager:
     def get_forecasts(self):
         return self._forecasts
 
+    def get_generation_time(self):
+        return self._generation_time
+
     """
     TO STRING FUNCTION FORMAT:
         Daily forecast generated at: formatted_time
@@ -55,9 +65,9 @@ class DailyForecastManager:
 
     #write a to string function that matches the format at the top of the file.
     def __str__(self):
-        dt = datetime.fromisoformat(self._generation_time)
-        time_zone = dt.astimezone()
-        formatted_time = time_zone.strftime('%I:%M %p')
+        # (the time is parsed and labelled with the fast helpers in iso_time.py, in this computer's time zone)
+        generated = to_epoch(self._generation_time)
+        formatted_time = "N/A" if generated is None else hour_label(generated, local_offset(generated))
 
         #a very creative variable name
         function_output = [f"Daily forecast generated at: {formatted_time}"]
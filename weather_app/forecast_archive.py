@@ -0,0 +1,236 @@
+"""
+An append-only archive of every forecast issuance, for looking back at how forecasts changed.
+
+Issuances are appended to segment files (segment_00000.dat, ...), which are never rewritten; a new segment is
+started once the current one reaches the segment size. Only the newest `keep_segments` segments are kept: when
+a new segment is started, the oldest ones are deleted along with their issuances, so the archive stays bounded
+at about segment_size * keep_segments bytes. An hourly issuance is stored as a binary snapshot
+(see forecast_snapshot.py) and is read back straight from the memory-mapped segment; a daily issuance is
+stored as zlib compressed JSON rows.
+
+Every issuance also gets a line in index.jsonl with its grid cell, kind, generation time, the time range its
+periods cover and where it is in the segments. The index is loaded into memory, so the queries only look at
+the issuances that can match instead of scanning the segments.
+An issuance is only archived once: appending one with the same grid cell, kind and generation time again
+(e.g. when the same forecast is fetched twice) returns the entry already in the archive.
+"""
+import io
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import namedtuple
+from datetime import datetime
+import forecast_snapshot
+from atomic_file import write_atomic
+from iso_time import to_epoch
+
+DEFAULT_SEGMENT_SIZE = 16 * 1024 * 1024
+DEFAULT_KEEP_SEGMENTS = 4
+
+# The time index groups issuances by the days (UTC) their periods cover
+_DAY = 24 * 60 * 60
+_HOUR = 60 * 60
+
+# Every record in a segment starts with a marker and the length of its data, and is padded to 8 bytes
+_RECORD_HEADER = struct.Struct("<4sI")
+_RECORD_MARKER = b"WXAR"
+
+# One archived issuance. generated_at, start and end are epoch seconds; the periods cover [start, end).
+ArchiveEntry = namedtuple("ArchiveEntry", ["cell", "kind", "generated_at", "start", "end",
+                                           "segment", "offset", "length"])
+
+
+class ForecastArchive:
+    """Appends forecast issuances to segment files and answers time range queries over them (see above)."""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root="forecast_archive", segment_size=DEFAULT_SEGMENT_SIZE, keep_segments=DEFAULT_KEEP_SEGMENTS):
+        self._root = root
+        self._segment_size = segment_size
+        self._keep_segments = max(keep_segments, 1)
+        self._lock = threading.Lock()
+        self._by_location = {}  # (cell, kind) -> entries sorted by generation time
+        self._by_day = {}       # (kind, day number) -> entries with periods in that day
+        self._maps = {}         # segment number -> mmap of it, for reading
+        self._segment = 0
+        self._load_index()
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide archive used by ForecastWorker."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def append_hourly(self, cell, generated_at, columns):
+        """Archives an hourly issuance (HourlyForecastColumns) of a grid cell; generated_at is an ISO time."""
+        if not len(columns):
+            return None
+        data = io.BytesIO()
+        forecast_snapshot.write_snapshot(data, columns, {"generation_time": generated_at})
+        return self._append(cell, "hourly", generated_at, columns.start_time[0], columns.start_time[-1] + _HOUR,
+                            data.getvalue())
+
+    def append_daily(self, cell, generated_at, rows):
+        """Archives a daily issuance (daily forecast rows, see forecast_rows.py) of a grid cell."""
+        start_times = [to_epoch(row.get("start_time")) for row in rows]
+        end_times = [to_epoch(row.get("end_time")) for row in rows]
+        start_times = [start_time for start_time in start_times if start_time is not None]
+        end_times = [end_time for end_time in end_times if end_time is not None]
+        if not start_times or not end_times:
+            return None
+        data = zlib.compress(json.dumps(rows).encode("utf-8"))
+        return self._append(cell, "daily", generated_at, min(start_times), max(end_times), data)
+
+    def latest(self, cell, kind="hourly", count=1):
+        """Returns the last `count` issuances of a grid cell, newest first."""
+        with self._lock:
+            entries = self._by_location.get((cell, kind), [])
+            return list(reversed(entries[-count:])) if count > 0 else []
+
+    def covering(self, instant, kind="hourly", cell=None):
+        """
+        Returns the issuances with a period covering an instant (epoch seconds or an aware datetime),
+        optionally only those of one grid cell, oldest first.
+        """
+        if isinstance(instant, datetime):
+            instant = instant.timestamp()
+        with self._lock:
+            candidates = self._by_day.get((kind, math.floor(instant / _DAY)), [])
+            return [entry for entry in candidates
+                    if entry.start <= instant < entry.end and (cell is None or entry.cell == cell)]
+
+    def read(self, entry):
+        """
+        Returns the forecast of an issuance: HourlyForecastColumns read straight from the segment for hourly
+        issuances, or the list of daily forecast rows.
+        """
+        view = self._view(entry)
+        if entry.kind == "hourly":
+            return forecast_snapshot.read_snapshot(view)[0]
+        return json.loads(zlib.decompress(view))
+
+    def _append(self, cell, kind, generated_at, start, end, data):
+        generated = to_epoch(generated_at)
+        with self._lock:
+            archived = _find_issuance(self._by_location.get((cell, kind), ()), generated)
+            if archived is not None:
+                return archived
+
+            path = self._segment_path(self._segment)
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            if offset and offset + _RECORD_HEADER.size + len(data) > self._segment_size:
+                self._segment += 1
+                path = self._segment_path(self._segment)
+                offset = 0
+                self._prune()
+
+            # The data is written before its index line, so the index never points at a missing record
+            padding = -(_RECORD_HEADER.size + len(data)) % 8
+            with open(path, "ab") as segment_file:
+                segment_file.write(_RECORD_HEADER.pack(_RECORD_MARKER, len(data)))
+                segment_file.write(data)
+                segment_file.write(b"\0" * padding)
+
+            entry = ArchiveEntry(cell, kind, generated if generated is not None else 0, start, end,
+                                 self._segment, offset + _RECORD_HEADER.size, len(data))
+            with open(os.path.join(self._root, "index.jsonl"), "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps(entry._asdict()) + "\n")
+            self._add(entry)
+            return entry
+
+    def _add(self, entry):
+        _add_in_order(self._by_location.setdefault((entry.cell, entry.kind), []), entry)
+        for day in range(math.floor(entry.start / _DAY), math.floor((entry.end - 1) / _DAY) + 1):
+            _add_in_order(self._by_day.setdefault((entry.kind, day), []), entry)
+
+    def _view(self, entry):
+        # Maps the segment (again, if it has grown past the old mapping) and returns the entry's data
+        with self._lock:
+            mapped = self._maps.get(entry.segment)
+            if mapped is None or len(mapped) < entry.offset + entry.length:
+                with open(self._segment_path(entry.segment), "rb") as segment_file:
+                    mapped = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[entry.segment] = mapped
+        marker, length = _RECORD_HEADER.unpack_from(mapped, entry.offset - _RECORD_HEADER.size)
+        if marker != _RECORD_MARKER or length != entry.length:
+            raise ValueError(f"archive segment {entry.segment} has no record at {entry.offset}")
+        return memoryview(mapped)[entry.offset:entry.offset + entry.length]
+
+    def _load_index(self):
+        os.makedirs(self._root, exist_ok=True)
+        try:
+            with open(os.path.join(self._root, "index.jsonl"), "r", encoding="utf-8") as index_file:
+                for line in index_file:
+                    try:
+                        entry = ArchiveEntry(**json.loads(line))
+                    except (TypeError, ValueError):
+                        # A line cut off by a crash; its record is just not indexed
+                        continue
+                    self._add(entry)
+                    self._segment = max(self._segment, entry.segment)
+        except OSError:
+            pass
+        self._prune()
+
+    def _prune(self):
+        # Drops the segments older than the newest keep_segments: their issuances leave the index first, then
+        # their files are deleted
+        oldest = self._segment - self._keep_segments + 1
+        if oldest <= 0:
+            return
+        entries = {entry for entries in self._by_location.values() for entry in entries}
+        if any(entry.segment < oldest for entry in entries):
+            kept = sorted((entry for entry in entries if entry.segment >= oldest),
+                          key=lambda entry: (entry.segment, entry.offset))
+            self._by_location = {}
+            self._by_day = {}
+            for entry in kept:
+                self._add(entry)
+            self._write_index(kept)
+        for segment in [segment for segment in self._maps if segment < oldest]:
+            # Not closed: a forecast read from it may still use the mapping
+            del self._maps[segment]
+        for name in os.listdir(self._root):
+            if name.startswith("segment_") and name.endswith(".dat") and name[8:-4].isdigit() \
+                    and int(name[8:-4]) < oldest:
+                try:
+                    os.remove(os.path.join(self._root, name))
+                except OSError:
+                    # Probably still mapped by a reader; it will be removed after a later prune
+                    pass
+
+    def _write_index(self, entries):
+        # Rewrites index.jsonl atomically, so a crash leaves either the old or the new index
+        lines = "".join(json.dumps(entry._asdict()) + "\n" for entry in entries)
+        write_atomic(os.path.join(self._root, "index.jsonl"), lines.encode("utf-8"))
+
+    def _segment_path(self, segment):
+        return os.path.join(self._root, f"segment_{segment:05d}.dat")
+
+
+def _find_issuance(entries, generated):
+    # Returns the entry generated at an epoch time from a list in generation order (newest last), or None.
+    # Issuances without a generation time are all stored as 0, so they never count as the same one
+    if generated is None:
+        return None
+    for entry in reversed(entries):
+        if entry.generated_at == generated:
+            return entry
+        if entry.generated_at < generated:
+            return None
+    return None
+
+
+def _add_in_order(entries, entry):
+    # Keeps a list of issuances in generation order; they are nearly always archived in that order already
+    entries.append(entry)
+    if len(entries) > 1 and entries[-2].generated_at > entry.generated_at:
+        entries.sort(key=lambda archived: archived.generated_at)
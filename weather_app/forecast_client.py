@@ -0,0 +1,310 @@
+import asyncio
+import json
+import threading
+import aiohttp
+from forecast_stream import CHUNK_SIZE, PeriodStreamParser, parse_periods
+from gridpoint_cache import GridpointCache
+from http_cache import HttpCache
+
+
+class AsyncForecastClient:
+    """
+    An asyncio client for the api.weather.gov forecast endpoints.
+
+    All requests share one aiohttp connection pool, go through the shared HTTP cache (responses are revalidated
+    with ETag / Last-Modified) and gridpoint cache (a known coordinate skips the /points lookup), and can be
+    given their own timeout. With a RateLimiter every request to the API first waits for a token of it.
+    Every coroutine can be cancelled.
+    The caches read and write files, so they are always used from a worker thread (asyncio.to_thread())
+    and never block the other requests on the event loop; so are the callbacks of stream().
+    Use it as an async context manager so the connection pool is closed afterwards:
+
+        async with AsyncForecastClient() as client:
+            gridpoint, daily_data, hourly_data = await client.fetch(40.7128, -74.006)
+    """
+
+    def __init__(self, http_cache=None, gridpoint_cache=None, timeout=10, max_connections=100, rate_limiter=None):
+        self._http_cache = http_cache or HttpCache.shared()
+        self._gridpoint_cache = gridpoint_cache or GridpointCache.shared()
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._rate_limiter = rate_limiter
+        self._session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._max_connections))
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def fetch(self, latitude, longitude, timeout=None):
+        """
+        Fetches both forecasts for a coordinate, requesting the daily and hourly forecasts concurrently.
+        Returns a tuple of (gridpoint, daily forecast data, hourly forecast data).
+        A 404 on cached forecast endpoints means they have moved, so they are looked up again and retried once.
+        """
+        # Round latitude and longitude to 4 decimal places for consistency
+        latitude = round(latitude, 4)
+        longitude = round(longitude, 4)
+        gridpoint, from_cache = await self.lookup_gridpoint(latitude, longitude, timeout)
+        return await self.fetch_gridpoint(latitude, longitude, gridpoint, from_cache, timeout)
+
+    async def lookup_gridpoint(self, latitude, longitude, timeout=None):
+        """
+        Returns the forecast endpoints of a (rounded) coordinate, asking the API only if they aren't cached.
+        The result is a tuple of (gridpoint, whether it came from the cache).
+        """
+        gridpoint = self._gridpoint_cache.get(latitude, longitude)
+        if gridpoint is not None:
+            return gridpoint, True
+        return await self.fetch_points(latitude, longitude, timeout=timeout), False
+
+    async def fetch_gridpoint(self, latitude, longitude, gridpoint, from_cache, timeout=None):
+        """
+        Fetches both forecasts of a gridpoint looked up for a (rounded) coordinate with lookup_gridpoint().
+        Returns a tuple of (gridpoint, daily forecast data, hourly forecast data); the gridpoint is a new one
+        if the cached endpoints had moved.
+        """
+        gridpoint, daily_forecast_data, hourly_forecast_data = await self._fetch_with_gridpoint(
+            latitude, longitude, gridpoint, from_cache, timeout, self._fetch_both
+        )
+        # Remember the grid cell's polygon, so nearby coordinates in the same cell can skip the /points lookup
+        await asyncio.to_thread(self._gridpoint_cache.remember_polygon, latitude, longitude, daily_forecast_data)
+        return gridpoint, daily_forecast_data, hourly_forecast_data
+
+    async def stream(self, latitude, longitude, on_daily_periods, on_hourly_periods, timeout=None):
+        """
+        Streaming version of fetch(): the periods of each forecast are decoded as its response arrives
+        and handed to on_daily_periods / on_hourly_periods(gridpoint, periods, stream) in batches, instead of
+        the whole responses being loaded into memory. stream is the forecast's PeriodStreamParser.
+        Returns a tuple of (gridpoint, daily PeriodStreamParser, hourly PeriodStreamParser); the parsers have
+        the generated_at time and the period count of each forecast.
+        A 404 on cached forecast endpoints is only retried if no periods were handed over yet.
+        """
+        latitude = round(latitude, 4)
+        longitude = round(longitude, 4)
+        handed_over = []
+
+        def handler(on_periods, gridpoint):
+            def handle(periods, stream):
+                handed_over.append(len(periods))
+                on_periods(gridpoint, periods, stream)
+            return handle
+
+        async def stream_both(gridpoint, timeout):
+            return await asyncio.gather(
+                self.stream_periods(gridpoint["forecast"], handler(on_daily_periods, gridpoint), timeout),
+                self.stream_periods(gridpoint["forecastHourly"], handler(on_hourly_periods, gridpoint), timeout)
+            )
+
+        gridpoint, from_cache = await self.lookup_gridpoint(latitude, longitude, timeout)
+        gridpoint, daily_stream, hourly_stream = await self._fetch_with_gridpoint(
+            latitude, longitude, gridpoint, from_cache, timeout, stream_both, can_retry=lambda: not handed_over
+        )
+        await asyncio.to_thread(self._gridpoint_cache.remember_polygon, latitude, longitude,
+                                {"geometry": daily_stream.geometry})
+        return gridpoint, daily_stream, hourly_stream
+
+    async def _fetch_with_gridpoint(self, latitude, longitude, gridpoint, from_cache, timeout, fetch_both,
+                                    can_retry=lambda: True):
+        # Runs fetch_both(gridpoint, timeout) with the gridpoint of a coordinate,
+        # looking the gridpoint up again and retrying once if cached endpoints return 404
+        try:
+            daily_result, hourly_result = await fetch_both(gridpoint, timeout)
+        except aiohttp.ClientResponseError as e:
+            if not from_cache or e.status != 404:
+                raise
+            await asyncio.to_thread(self._gridpoint_cache.invalidate, latitude, longitude)
+            if not can_retry():
+                raise
+            gridpoint = await self.fetch_points(latitude, longitude, timeout=timeout, refresh=True)
+            daily_result, hourly_result = await fetch_both(gridpoint, timeout)
+        return gridpoint, daily_result, hourly_result
+
+    async def fetch_points(self, latitude, longitude, timeout=None, refresh=False):
+        """
+        Asks the API for the forecast endpoints of a coordinate and remembers them in the gridpoint cache.
+        With refresh=True a cached copy of the /points response is thrown away first.
+        """
+        latitude = round(latitude, 4)
+        longitude = round(longitude, 4)
+        location_url = f"https://api.weather.gov/points/{latitude},{longitude}"
+        if refresh:
+            await asyncio.to_thread(self._http_cache.invalidate, location_url)
+        location_data = await self._get_api_data(location_url, timeout)
+        return await asyncio.to_thread(self._gridpoint_cache.put, latitude, longitude, location_data["properties"])
+
+    async def fetch_daily(self, gridpoint, timeout=None):
+        """Requests the daily forecast of a gridpoint returned by fetch_points()."""
+        return await self._get_api_data(gridpoint["forecast"], timeout)
+
+    async def fetch_hourly(self, gridpoint, timeout=None):
+        """Requests the hourly forecast of a gridpoint returned by fetch_points()."""
+        return await self._get_api_data(gridpoint["forecastHourly"], timeout)
+
+    async def _fetch_both(self, gridpoint, timeout):
+        return await asyncio.gather(self.fetch_daily(gridpoint, timeout), self.fetch_hourly(gridpoint, timeout))
+
+    async def stream_periods(self, url, on_periods, timeout=None):
+        """
+        Requests a forecast and decodes its periods as the response arrives, calling on_periods(periods, parser)
+        with each batch of newly decoded periods. The response goes through the HTTP cache like _get_api_data(): a cached
+        body is decoded from disk in chunks, and a downloaded one is written to the cache as it arrives.
+        Each chunk is written, decoded and handed to on_periods in a worker thread, off the event loop.
+        Returns the PeriodStreamParser, which has the generated_at time and the geometry of the forecast.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncForecastClient must be used inside 'async with'")
+
+        entry, chunks = await asyncio.to_thread(self._http_cache.cached_chunks, url, CHUNK_SIZE)
+        if chunks is not None:
+            return await asyncio.to_thread(parse_periods, chunks, on_periods)
+
+        request_timeout = aiohttp.ClientTimeout(total=timeout or self._timeout)
+        headers = self._http_cache.conditional_headers(entry)
+        await self._wait_for_rate_limit()
+        async with self._session.get(url, headers=headers, timeout=request_timeout) as response:
+            if response.status == 304 and entry is not None:
+                chunks = await asyncio.to_thread(self._http_cache.not_modified_chunks, url, response.headers,
+                                                 CHUNK_SIZE)
+                if chunks is not None:
+                    return await asyncio.to_thread(parse_periods, chunks, on_periods)
+            else:
+                response.raise_for_status()  # Raises an error if request failed
+                parser = PeriodStreamParser()
+                body_writer = await asyncio.to_thread(self._http_cache.body_writer, url, response.headers)
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        await asyncio.to_thread(_consume_chunk, chunk, body_writer, parser, on_periods)
+                    parser.close()
+                except BaseException as e:
+                    await asyncio.to_thread(body_writer.__exit__, type(e), e, e.__traceback__)
+                    raise
+                # The body only replaces the cached entry once the whole response arrived
+                await asyncio.to_thread(body_writer.__exit__, None, None, None)
+                return parser
+
+        # The body went missing on disk, so ask again without validators
+        await asyncio.to_thread(self._http_cache.invalidate, url)
+        return await self.stream_periods(url, on_periods, timeout)
+
+    async def _get_api_data(self, url, timeout=None):
+        """
+        Sends a GET request to the given API URL and returns the response as a dictionary (parsed JSON).
+        A fresh cached response is returned without a request and a stale one is revalidated.
+        Raises aiohttp.ClientResponseError for HTTP errors and asyncio.TimeoutError when the request times out.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncForecastClient must be used inside 'async with'")
+
+        entry, body = await asyncio.to_thread(self._http_cache.cached_body, url)
+        if body is not None:
+            return json.loads(body)
+
+        request_timeout = aiohttp.ClientTimeout(total=timeout or self._timeout)
+        headers = self._http_cache.conditional_headers(entry)
+        await self._wait_for_rate_limit()
+        async with self._session.get(url, headers=headers, timeout=request_timeout) as response:
+            if response.status == 304 and entry is not None:
+                body = await asyncio.to_thread(self._http_cache.not_modified, url, response.headers)
+                if body is not None:
+                    return json.loads(body)
+            else:
+                response.raise_for_status()  # Raises an error if request failed
+                body = await response.read()
+                await asyncio.to_thread(self._http_cache.downloaded, url, response.headers, body)
+                return json.loads(body)
+
+        # The body went missing on disk, so ask again without validators
+        await asyncio.to_thread(self._http_cache.invalidate, url)
+        return await self._get_api_data(url, timeout)
+
+    async def _wait_for_rate_limit(self):
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire_async()
+
+    def get_cache_stats(self):
+        """Returns the hit / miss / revalidation counters of the HTTP cache."""
+        return self._http_cache.get_stats()
+
+
+def _consume_chunk(chunk, body_writer, parser, on_periods):
+    # Writes a chunk of a streamed response to the cache and hands over the periods it completes
+    body_writer.write(chunk)
+    periods = parser.feed(chunk)
+    if periods:
+        on_periods(periods, parser)
+
+
+class ForecastClientLoop:
+    """
+    One AsyncForecastClient on one event loop, running in a background thread for the whole process.
+
+    Every ForecastWorker runs its requests on it instead of starting an event loop and a client of its own,
+    so the connections to the API (and their TLS sessions) are kept alive and reused from one refresh to the
+    next. Call close_shared() when the application quits.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client=None):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="forecast-client", daemon=True)
+        self._thread.start()
+        # The aiohttp session has to be created on the loop it is used from
+        client = client or AsyncForecastClient()
+        self._client = asyncio.run_coroutine_threadsafe(client.open(), self._loop).result()
+
+    @property
+    def client(self):
+        return self._client
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide client loop used by ForecastWorker, starting it the first time."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls):
+        """Closes the process wide client loop, if it was started."""
+        with cls._shared_lock:
+            shared, cls._shared = cls._shared, None
+        if shared is not None:
+            shared.close()
+
+    def submit(self, call):
+        """
+        Runs call(client) (a coroutine function of the AsyncForecastClient) on the loop. Safe to call from any thread.
+        Returns a concurrent.futures.Future of its result; cancelling the future cancels the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(call(self._client), self._loop)
+
+    async def _shut_down(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._client.close()
+
+    def close(self):
+        """Cancels the requests still running, closes the client's connections and stops the loop."""
+        try:
+            asyncio.run_coroutine_threadsafe(self._shut_down(), self._loop).result()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
@@ -0,0 +1,142 @@
+"""
+Change detection between consecutive issuances of a forecast.
+
+A new issuance (a new generatedAt) often has mostly the same periods as the previous one. Every period row
+(see forecast_rows.py) is hashed over the fields written to the CSV files, and the hashes are compared by start
+time with those of the previous issuance of the same grid cell. The result is a ForecastDelta, so the work
+after a fetch (saving, archiving, rebuilding the forecast managers) can be skipped when nothing changed.
+"""
+import hashlib
+import threading
+from iso_time import to_epoch
+
+# The period number is left out of the hash: it shifts every time a period expires, without the period changing
+_UNHASHED_FIELDS = {"forecast_period"}
+
+
+class ForecastDelta:
+    """
+    The difference between an issuance of a forecast and the previous one of the same grid cell.
+
+    added and changed are the rows of the new and the changed periods; removed are the start times of the periods
+    that are no longer forecast, and expired those of the periods that are gone because they are over
+    (they start before the first period of the new issuance). Expired periods alone don't count as a change.
+    """
+
+    def __init__(self, added, changed, removed, expired, unchanged):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.expired = expired
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def __str__(self):
+        if not self and not self.expired:
+            return "unchanged"
+        return (f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed, "
+                f"{len(self.expired)} expired")
+
+
+class ForecastDeltaTracker:
+    """
+    Keeps the period hashes of the last issuance of each grid cell and kind of forecast ("daily", "hourly"),
+    and returns the delta of every new issuance against it.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._issuances = {}  # (cell, kind) -> {start time: hash}
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide tracker used by ForecastWorker."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def diff(self, cell, kind, rows, headers):
+        """Returns the ForecastDelta of an issuance (a list of rows) and remembers it as the last one."""
+        builder = self.begin(cell, kind, headers)
+        builder.add(rows)
+        return builder.finish()
+
+    def begin(self, cell, kind, headers):
+        """
+        Starts comparing an issuance whose rows arrive in batches (e.g. while streaming).
+        Returns a builder: call add(rows) with every batch, then finish() for the ForecastDelta.
+        """
+        return _DeltaBuilder(self, (cell, kind), headers)
+
+    def forget(self, cell, kind=None):
+        with self._lock:
+            for key in [key for key in self._issuances if key[0] == cell and kind in (None, key[1])]:
+                del self._issuances[key]
+
+    def _previous(self, key):
+        with self._lock:
+            return self._issuances.get(key, {})
+
+    def _store(self, key, hashes):
+        with self._lock:
+            self._issuances[key] = hashes
+
+
+class _DeltaBuilder:
+    """
+    Hashes the rows of one issuance as they arrive; see ForecastDeltaTracker.begin().
+    Each row is compared with the previous issuance right away, so only the added and changed rows are kept.
+    """
+
+    def __init__(self, tracker, key, headers):
+        self._tracker = tracker
+        self._key = key
+        self._fields = [field for field in headers if field not in _UNHASHED_FIELDS]
+        self._previous = tracker._previous(key)
+        self._hashes = {}
+        self._added = []
+        self._changed = []
+        self._unchanged = 0
+        self._first_start = None
+
+    def add(self, rows):
+        for row in rows:
+            start_time = row.get("start_time")
+            if start_time and self._first_start is None:
+                self._first_start = start_time
+            # A period without a start time is told apart by its position in the issuance
+            key = start_time or f"#{len(self._hashes)}"
+            row_digest = self._hashes[key] = row_hash(row, self._fields)
+            previous_digest = self._previous.get(key)
+            if previous_digest is None:
+                self._added.append(row)
+            elif previous_digest != row_digest:
+                self._changed.append(row)
+            else:
+                self._unchanged += 1
+
+    def finish(self):
+        self._tracker._store(self._key, self._hashes)
+        first_start = to_epoch(self._first_start)
+        removed, expired = [], []
+        for start_time in self._previous:
+            if start_time in self._hashes:
+                continue
+            start = to_epoch(start_time)
+            if first_start is not None and start is not None and start < first_start:
+                expired.append(start_time)
+            else:
+                removed.append(start_time)
+        return ForecastDelta(self._added, self._changed, removed, expired, self._unchanged)
+
+
+def row_hash(row, fields):
+    """Returns a hash of the fields of a row, with the values as they are written to the CSV files."""
+    text = "\x1f".join("" if row.get(field) is None else str(row.get(field)) for field in fields)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
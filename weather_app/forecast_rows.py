@@ -0,0 +1,53 @@
+"""
+Turns the periods of an api.weather.gov forecast into flat rows.
+These are the rows written to the forecast CSV files, and the rows the forecast managers are built from.
+"""
+
+DAILY_FORECAST_HEADERS = ["forecast_period", "name", "start_time", "end_time", "isDaytime", "temperature",
+                          "temperature_unit", "temperature_trend", "precipitation_probability_unit",
+                          "precipitation_probability_value", "wind_speed", "wind_direction", "weather_icon_url",
+                          "short_forecast", "detailed_forecast"]
+
+HOURLY_FORECAST_HEADERS = ["forecast_period", "start_time", "temperature", "temperature_unit",
+                           "precipitation_probability_unit", "precipitation_probability_value",
+                           "dewpoint_unit", "dewpoint_value", "relative_humidity_unit", "relative_humidity_value",
+                           "wind_speed", "wind_direction", "weather_icon_url", "short_forecast"]
+
+
+def daily_forecast_row(period):
+    """Returns the daily forecast row for one period of a forecast response."""
+    return {
+        "forecast_period": period.get("number", ""),
+        "name": period.get("name", ""),
+        "start_time": period.get("startTime", ""),
+        "end_time": period.get("endTime", ""),
+        "isDaytime": period.get("isDaytime", ""),
+        "temperature": period.get("temperature", ""),
+        "temperature_unit": period.get("temperatureUnit", ""),
+        "temperature_trend": period.get("temperatureTrend", ""),
+        "precipitation_probability_unit": period.get("probabilityOfPrecipitation", {}).get("unitCode", ""),
+        "precipitation_probability_value": period.get("probabilityOfPrecipitation", {}).get("value", ""),
+        "wind_speed": period.get("windSpeed", ""),
+        "wind_direction": period.get("windDirection", ""),
+        "weather_icon_url": period.get("icon", ""),
+        "short_forecast": period.get("shortForecast", ""),
+        "detailed_forecast": period.get("detailedForecast", "")}
+
+
+def hourly_forecast_row(period):
+    """Returns the hourly forecast row for one period of a forecastHourly response."""
+    return {
+        "forecast_period": period.get("number", ""),
+        "start_time": period.get("startTime", ""),
+        "temperature": period.get("temperature", ""),
+        "temperature_unit": period.get("temperatureUnit", ""),
+        "precipitation_probability_unit": period.get("probabilityOfPrecipitation", {}).get("unitCode", ""),
+        "precipitation_probability_value": period.get("probabilityOfPrecipitation", {}).get("value", ""),
+        "dewpoint_unit": period.get("dewpoint", {}).get("unitCode", ""),
+        "dewpoint_value": period.get("dewpoint", {}).get("value", ""),
+        "relative_humidity_unit": period.get("relativeHumidity", {}).get("unitCode", ""),
+        "relative_humidity_value": period.get("relativeHumidity", {}).get("value", ""),
+        "wind_speed": period.get("windSpeed", ""),
+        "wind_direction": period.get("windDirection", ""),
+        "weather_icon_url": period.get("icon", ""),
+        "short_forecast": period.get("shortForecast", "")}
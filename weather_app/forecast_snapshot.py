@@ -0,0 +1,122 @@
+"""
+A binary snapshot format for hourly forecast columns (see HourlyForecastColumns).
+
+A snapshot is the columns' arrays written out as they are, so loading one doesn't parse any text:
+the file is memory-mapped and every column is a memoryview cast straight onto its part of the file.
+
+Layout (every section starts on an 8 byte boundary):
+    header          magic, byte order of the columns, row count, string count, metadata length
+    metadata        UTF-8 JSON, e.g. {"generation_time": "2025-05-01T03:15:00+00:00"}
+    columns         one block per column in COLUMN_TYPES order, row count * item size bytes each
+    string offsets  string count + 1 uint32 offsets into the string data
+    string data     the UTF-8 strings of the string table, back to back
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from hourly_forecast_columns import COLUMN_TYPES, HourlyForecastColumns
+
+SNAPSHOT_EXTENSION = ".snapshot"
+
+_MAGIC = b"WXHOURS1"
+_HEADER = struct.Struct("<8sc3xIII")
+_BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+def write_snapshot(snapshot_file, columns, metadata=None):
+    """Writes the columns and a dict of JSON serializable metadata to a file opened in binary mode."""
+    strings = [value.encode("utf-8") for value in columns.strings()]
+    offsets = array("I", [0])
+    for value in strings:
+        offsets.append(offsets[-1] + len(value))
+    metadata = json.dumps(metadata or {}).encode("utf-8")
+
+    position = _write(snapshot_file, _HEADER.pack(_MAGIC, _BYTE_ORDER, len(columns), len(strings), len(metadata)), 0)
+    position = _write(snapshot_file, metadata, position)
+    for name, _ in COLUMN_TYPES:
+        position = _write(snapshot_file, getattr(columns, name), position)
+    position = _write(snapshot_file, offsets, position)
+    snapshot_file.write(b"".join(strings))
+
+
+def load_snapshot(path):
+    """
+    Memory-maps a snapshot file and returns a tuple of (HourlyForecastColumns, metadata dict).
+    The columns are views into the mapped file, so nothing is copied; the mapping stays open as long as they
+    are in use. Raises ValueError if the file isn't a complete snapshot written on a machine with the same
+    byte order (e.g. it is empty or was cut off).
+    """
+    with open(path, "rb") as snapshot_file:
+        # An empty file can't be mapped
+        if os.fstat(snapshot_file.fileno()).st_size < _HEADER.size:
+            raise ValueError(f"{path}: not a forecast snapshot")
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return read_snapshot(memoryview(mapped))
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+
+
+def read_snapshot(view):
+    """
+    Returns a tuple of (HourlyForecastColumns, metadata dict) of a snapshot in a memoryview (e.g. of part of
+    a memory-mapped file). The columns are views into it, so nothing is copied.
+    Raises ValueError if it isn't a complete snapshot.
+    """
+    if len(view) < _HEADER.size:
+        raise ValueError("not a forecast snapshot")
+    magic, byte_order, rows, string_count, metadata_length = _HEADER.unpack_from(view)
+    if magic != _MAGIC:
+        raise ValueError("not a forecast snapshot")
+    if byte_order != _BYTE_ORDER:
+        raise ValueError("written on a machine with a different byte order")
+
+    position = _HEADER.size
+    _check_size(view, position + metadata_length)
+    try:
+        metadata = json.loads(bytes(view[position:position + metadata_length]) or b"{}")
+    except ValueError:
+        raise ValueError("corrupt forecast snapshot metadata") from None
+    position = _aligned(position + metadata_length)
+
+    buffers = {}
+    for name, type_code in COLUMN_TYPES:
+        size = rows * array(type_code).itemsize
+        _check_size(view, position + size)
+        buffers[name] = view[position:position + size].cast(type_code)
+        position = _aligned(position + size)
+
+    _check_size(view, position + (string_count + 1) * 4)
+    offsets = view[position:position + (string_count + 1) * 4].cast("I")
+    position = _aligned(position + (string_count + 1) * 4)
+    _check_size(view, position + offsets[-1])
+    # The string table is small (only distinct strings), so it is decoded right away
+    try:
+        strings = [str(view[position + offsets[index]:position + offsets[index + 1]], "utf-8")
+                   for index in range(string_count)]
+    except ValueError:
+        raise ValueError("corrupt forecast snapshot strings") from None
+
+    return HourlyForecastColumns.from_buffers(buffers, strings), metadata
+
+
+def _write(snapshot_file, data, position):
+    # Writes a block and pads it to the next 8 byte boundary; returns the position after the padding
+    size = memoryview(data).nbytes
+    snapshot_file.write(data)
+    padding = _aligned(position + size) - position - size
+    snapshot_file.write(b"\0" * padding)
+    return position + size + padding
+
+
+def _check_size(view, end):
+    # A snapshot cut off before the end of a section (e.g. by a crash while it was written)
+    if len(view) < end:
+        raise ValueError("truncated forecast snapshot")
+
+
+def _aligned(position):
+    return (position + 7) // 8 * 8
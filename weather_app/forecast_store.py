@@ -0,0 +1,97 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class ForecastStore:
+    """
+    Stores forecast CSV files per grid cell and generation time, e.g.
+
+        forecasts/OKX_33_35/hourly_20250501T031500Z.csv
+
+    Other formats of a forecast (e.g. binary snapshots) are stored next to it with their own extension.
+
+    Files are written to a temporary name and renamed into place once complete, so concurrent
+    refreshes never overwrite each other and a reader never sees a half written file.
+    Only the newest `keep` files of each kind are kept per grid cell.
+    """
+
+    def __init__(self, root="forecasts", keep=5):
+        self._root = root
+        self._keep = keep
+
+    @contextmanager
+    def open_for_write(self, gridpoint, kind, generated_at, extension=".csv", binary=False):
+        """
+        Opens a new forecast file of the given kind ("daily" or "hourly") for writing, in binary mode if binary is set.
+        Use it in a with statement; the file only appears under its path_for() name when the block completes.
+        """
+        directory = self._directory(gridpoint)
+        os.makedirs(directory, exist_ok=True)
+        path = self.path_for(gridpoint, kind, generated_at, extension)
+        # A new, uniquely named temporary file for every writer, even two of the same thread
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            if binary:
+                forecast_file = os.fdopen(descriptor, "wb")
+            else:
+                forecast_file = os.fdopen(descriptor, "w", newline='', encoding="utf-8")
+            with forecast_file:
+                yield forecast_file
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self._prune(directory, kind, extension)
+
+    def path_for(self, gridpoint, kind, generated_at, extension=".csv"):
+        """Returns the path a forecast of the given kind and generation time is stored at."""
+        return os.path.join(self._directory(gridpoint), f"{kind}_{self._timestamp(generated_at)}{extension}")
+
+    def latest_path(self, gridpoint, kind, extension=".csv"):
+        """Returns the path of the newest stored forecast of the given kind, or None if there isn't one."""
+        paths = self._paths(self._directory(gridpoint), kind, extension)
+        return paths[-1] if paths else None
+
+    @staticmethod
+    def generation_time(path):
+        """Returns the generation time (an ISO string) of a forecast file stored by name, or None for another file."""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        try:
+            generated = datetime.strptime(stem.rpartition("_")[2], "%Y%m%dT%H%M%SZ")
+        except ValueError:
+            return None
+        return generated.replace(tzinfo=timezone.utc).isoformat()
+
+    def _directory(self, gridpoint):
+        return os.path.join(self._root, f"{gridpoint['gridId']}_{gridpoint['gridX']}_{gridpoint['gridY']}")
+
+    @staticmethod
+    def _timestamp(generated_at):
+        # Normalize to UTC so the file names sort in generation order
+        try:
+            generated = datetime.fromisoformat(generated_at).astimezone(timezone.utc)
+        except (TypeError, ValueError):
+            generated = datetime.now(timezone.utc)
+        return generated.strftime("%Y%m%dT%H%M%SZ")
+
+    @staticmethod
+    def _paths(directory, kind, extension):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        return sorted(os.path.join(directory, name) for name in names
+                      if name.startswith(f"{kind}_") and name.endswith(extension))
+
+    def _prune(self, directory, kind, extension):
+        for path in self._paths(directory, kind, extension)[:-self._keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                # Probably still open by a reader; it will be removed after a later write
+                pass
@@ -0,0 +1,113 @@
+"""
+Incremental decoding of api.weather.gov forecast responses.
+
+A forecast response is one JSON document with a "periods" array that grows with the forecast horizon
+(the hourly forecast has about 156 periods). PeriodStreamParser decodes the periods one at a time as the
+bytes of the response arrive, so only the unfinished tail of the response is ever held in memory
+instead of the whole body and its nested dicts.
+"""
+import codecs
+import json
+import re
+
+# Chunk size used to read response bodies and cached bodies
+CHUNK_SIZE = 64 * 1024
+
+_PERIODS_START = re.compile(r'"periods"\s*:\s*\[')
+_GENERATED_AT = re.compile(r'"generatedAt"\s*:\s*"([^"]*)"')
+_GEOMETRY = re.compile(r'"geometry"\s*:\s*')
+_SEPARATOR = re.compile(r'[\s,]*')
+
+
+class PeriodStreamParser:
+    """
+    Decodes the periods of a forecast response from chunks of its bytes.
+
+    feed() returns the periods completed by each chunk. Everything before the periods array is read once it has
+    arrived: generated_at is the "generatedAt" of the forecast and geometry its GeoJSON "geometry" (the grid
+    cell polygon). Both are None if the response doesn't have them.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        # "header" until the start of the periods array is found, then "periods", then "done"
+        self._state = "header"
+        self.generated_at = None
+        self.geometry = None
+        self.count = 0
+
+    def feed(self, chunk):
+        """Adds the next bytes of the response and returns the list of periods (dicts) completed by them."""
+        self._buffer += self._text_decoder.decode(chunk)
+        if self._state == "header":
+            match = _PERIODS_START.search(self._buffer)
+            if match is None:
+                return []
+            self._read_header(self._buffer[:match.start()])
+            self._buffer = self._buffer[match.end():]
+            self._state = "periods"
+        if self._state == "periods":
+            return self._decode_periods()
+        return []
+
+    def close(self):
+        """Call at the end of the response. Raises ValueError if the response ended before its periods did."""
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        if self._state != "done":
+            raise ValueError("forecast response has no complete 'periods' array")
+        # generatedAt normally comes before the periods, but look behind them too
+        if self.generated_at is None:
+            match = _GENERATED_AT.search(self._buffer)
+            if match:
+                self.generated_at = match.group(1)
+        self._buffer = ""
+
+    def _read_header(self, header):
+        match = _GENERATED_AT.search(header)
+        if match:
+            self.generated_at = match.group(1)
+        match = _GEOMETRY.search(header)
+        if match:
+            try:
+                self.geometry = self._decoder.raw_decode(header, match.end())[0]
+            except ValueError:
+                self.geometry = None
+
+    def _decode_periods(self):
+        periods = []
+        buffer = self._buffer
+        position = 0
+        while True:
+            position = _SEPARATOR.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                self._state = "done"
+                position += 1
+                break
+            try:
+                period, position_after = self._decoder.raw_decode(buffer, position)
+            except ValueError:
+                # The period isn't complete yet; wait for more of the response
+                break
+            periods.append(period)
+            position = position_after
+        self._buffer = buffer[position:]
+        self.count += len(periods)
+        return periods
+
+
+def parse_periods(chunks, on_periods):
+    """
+    Decodes the periods of a forecast response from an iterable of byte chunks, calling
+    on_periods(periods, parser) with each list of newly completed periods. Returns the finished parser.
+    """
+    parser = PeriodStreamParser()
+    for chunk in chunks:
+        periods = parser.feed(chunk)
+        if periods:
+            on_periods(periods, parser)
+    parser.close()
+    return parser
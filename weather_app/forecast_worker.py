@@ -1,8 +1,24 @@
+import asyncio
 import csv
-import requests
+import aiohttp
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 from geopy.location import Location
 from PyQt5.QtCore import QThread, pyqtSignal, QCoreApplication
+from daily_forecast_manager_class import DailyForecastManager
+from forecast_archive import ForecastArchive
+from forecast_client import ForecastClientLoop
+from forecast_delta import ForecastDeltaTracker
+from forecast_rows import DAILY_FORECAST_HEADERS, HOURLY_FORECAST_HEADERS, daily_forecast_row, hourly_forecast_row
+from forecast_snapshot import SNAPSHOT_EXTENSION, write_snapshot
+from forecast_store import ForecastStore
+from gridpoint_cache import grid_cell_key
+from hourly_forecast_manager_class import HourlyForecastManager
+
+# CSV files are written by one background thread, so saving never delays handing a forecast to the UI
+_csv_writer = ThreadPoolExecutor(max_workers=1)
+
 
 """
 A worker that fetches weather data in the background.
@@ -18,145 +34,332 @@ class ForecastWorker(QThread):
     """
     worker_finished = pyqtSignal(bool, str, str, str)
 
+    """
+    Emitted just before a successful worker_finished, with the DailyForecastManager and
+    HourlyForecastManager built straight from the fetched forecasts (no CSV round trip).
+    The hourly forecast may start with hours that are already over; the receiver trims them (trim_expired()).
+    """
+    forecasts_ready = pyqtSignal(object, object)
+
+    """
+    Emitted after a successful fetch with the ForecastDelta of the daily and the hourly forecast against the
+    previous ones of the same grid cell (both None if changes aren't detected).
+    """
+    forecasts_changed = pyqtSignal(object, object)
+
     """
     Initialize the ForecastWorker object by giving it the location from the user
     and set up this worker as a QThread.
     This is required so ForecastWorker can run its tasks in the background without freezing your program.
+    With streaming=True the forecast responses aren't loaded into memory whole: their periods are decoded
+    as they arrive and go straight into the forecast managers and the CSV files, so memory use stays
+    the same however long the forecast is.
+    With save_snapshot=True the hourly forecast is also saved as a binary snapshot, which loads much faster
+    than the CSV file (see HourlyForecastManager.load_snapshot()).
+    With an archive (the shared ForecastArchive unless archive_forecasts=False) every fetched forecast
+    is also appended to it, so earlier issuances are kept (up to the archive's size limit, see forecast_archive.py).
+    The requests run on the shared ForecastClientLoop (or client_loop), so all workers reuse one connection pool.
+    With change detection (the shared ForecastDeltaTracker unless detect_changes=False) a forecast whose periods
+    are the same as in the previous fetch of the grid cell isn't saved or archived again. With skip_unchanged=True
+    forecasts_ready isn't even emitted if neither forecast changed, e.g. when refreshing the forecasts shown.
     """
-    def __init__(self, location: Location) -> None:
+    def __init__(self, location: Location, store: ForecastStore = None, save_csv: bool = True,
+                 streaming: bool = False, save_snapshot: bool = True, archive: ForecastArchive = None,
+                 archive_forecasts: bool = True, deltas: ForecastDeltaTracker = None, detect_changes: bool = True,
+                 skip_unchanged: bool = False, client_loop: ForecastClientLoop = None) -> None:
         super().__init__()
         self.location = location
+        self.store = store or ForecastStore()
+        self.save_csv = save_csv
+        self.streaming = streaming
+        self.save_snapshot = save_snapshot
+        self.archive = (archive or ForecastArchive.shared()) if archive_forecasts else None
+        self.deltas = (deltas or ForecastDeltaTracker.shared()) if detect_changes else None
+        self.skip_unchanged = skip_unchanged
+        self.client_loop = client_loop
+        self._future = None
 
     
     def run(self) -> None:
         """
         This method starts running when the thread is activated.
-        It fetches weather forecast data, saves it to CSV files, and signals the result.
+        It fetches weather forecast data, builds the forecast managers from it, and signals the result.
+        Saving the CSV files is optional and happens in the background.
         """
         try:
-            # Step 1: Get location info from the API
-            # Round latitude and longitude to 4 decimal places for consistency
-            # Then use them to build the URL to retrieve local forecast endpoints
-            latitude = round(self.location.latitude, 4)
-            longitude = round(self.location.longitude, 4)
-            location_url = f"https://api.weather.gov/points/{latitude},{longitude}"
-            location_data = self._get_api_data(location_url)
-
-            # Step 2: Get daily forecast
-            # Use the forecast URL to request daily forecast data
-            # Save the time it was generated (or current time if not provided)
-            daily_forecast_url = location_data["properties"]["forecast"]
-            daily_forecast_data = self._get_api_data(daily_forecast_url)
+            if self.streaming:
+                self._run_streaming()
+                return
+
+            # Step 1: Get the daily and hourly forecasts
+            # The fetching is done by the asyncio client, on the event loop shared by all workers
+            gridpoint, daily_forecast_data, hourly_forecast_data = self._fetch_forecasts()
+
+            # Step 2: Turn the periods into rows
+            # Save the time each was generated (or current time if not provided)
+            # and turn the periods into rows the managers are built from directly
             daily_forecast_generated_time = (
                 daily_forecast_data["properties"].get("generatedAt", datetime.now().isoformat())
             )
-            # Write daily forecast data into a CSV file
-            self._save_daily_forecast(daily_forecast_data)
-
-            # Step 3: Get hourly forecast
-            # Use the forecastHourly URL to request hourly forecast data
-            # Save the time it was generated (or current time if not provided)
-            hourly_forecast_url = location_data["properties"]["forecastHourly"]
-            hourly_forecast_data = self._get_api_data(hourly_forecast_url)
+            daily_rows = [daily_forecast_row(period) for period in daily_forecast_data["properties"]["periods"]]
             hourly_forecast_generated_time = (
                 hourly_forecast_data["properties"].get("generatedAt", datetime.now().isoformat())
             )
-            # Write hourly forecast data into a CSV file
-            self._save_hourly_forecast(hourly_forecast_data)
+            hourly_rows = [hourly_forecast_row(period) for period in hourly_forecast_data["properties"]["periods"]]
+
+            # Step 3: Compare them with the previous forecasts of the grid cell
+            daily_delta = hourly_delta = None
+            if self.deltas is not None:
+                cell = grid_cell_key(gridpoint)
+                daily_delta = self.deltas.diff(cell, "daily", daily_rows, DAILY_FORECAST_HEADERS)
+                hourly_delta = self.deltas.diff(cell, "hourly", hourly_rows, HOURLY_FORECAST_HEADERS)
+            self.forecasts_changed.emit(daily_delta, hourly_delta)
+            if self.skip_unchanged and _unchanged(daily_delta) and _unchanged(hourly_delta):
+                self.worker_finished.emit(
+                    True, "Forecast unchanged", daily_forecast_generated_time, hourly_forecast_generated_time
+                )
+                return
 
-            # Step 4: Signal that the operation succeeded
-            # Send a success message, plus the times when each forecast was generated
+            # Step 4: Build the forecast managers
+            daily_manager = DailyForecastManager.from_rows(daily_rows, daily_forecast_generated_time)
+            hourly_manager = HourlyForecastManager.from_rows(hourly_rows, hourly_forecast_generated_time)
+
+            # Step 5: Save the forecasts that changed
+            # The rows are written into CSV files in the forecast store by the background writer
+            save_daily, save_hourly = _has_changes(daily_delta), _has_changes(hourly_delta)
+            if self.save_csv and save_daily:
+                self._save_in_background("daily", gridpoint, daily_forecast_generated_time, daily_rows)
+            if self.save_csv and save_hourly:
+                self._save_in_background("hourly", gridpoint, hourly_forecast_generated_time, hourly_rows)
+            if self.save_snapshot and save_hourly:
+                self._save_snapshot_in_background(gridpoint, hourly_forecast_generated_time, hourly_manager)
+            if self.archive is not None:
+                self._archive_in_background(gridpoint, daily_forecast_generated_time,
+                                            daily_rows if save_daily else None, hourly_forecast_generated_time,
+                                            hourly_manager if save_hourly else None)
+
+            # Step 6: Signal that the operation succeeded
+            # Hand over the forecasts, then send a success message plus the times when each forecast was generated
+            self.forecasts_ready.emit(daily_manager, hourly_manager)
             self.worker_finished.emit(
-                True, "Forecast CSV files written", daily_forecast_generated_time, hourly_forecast_generated_time
+                True, _fetched_message(daily_delta, hourly_delta), daily_forecast_generated_time,
+                hourly_forecast_generated_time
             )
+        # Handle the fetch being cancelled with cancel()
+        except (asyncio.CancelledError, CancelledError):
+            self.worker_finished.emit(False, "Forecast fetch cancelled", "", "")
         # Handle network-related issues, like connection timeouts
-        except requests.exceptions.RequestException as e:
-            self.worker_finished.emit(False, f"Forecast fetch failed: {str(e)}", "", "")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.worker_finished.emit(False, f"Forecast fetch failed: {str(e) or 'request timed out'}", "", "")
         # Handle problems with unexpected or missing data in the API response
-        except (KeyError, TypeError) as e:
+        except (KeyError, TypeError, ValueError) as e:
             self.worker_finished.emit(False, f"Invalid API response format: {str(e)}", "", "")
         # Handle file writing errors, like permission issues or missing directories
         except (IOError, OSError) as e:
             self.worker_finished.emit(False, f"File save failed: {str(e)}", "", "")
 
-    def _get_api_data(self, url: str) -> dict:
+    def _run_streaming(self) -> None:
         """
-        This helper method sends a GET request to the given API URL 
-        and returns the response as a dictionary (parsed JSON).
-    
-        It includes headers to make sure we don’t get old, cached data.
-        If the request fails (e.g., bad URL or network issue), it raises an error.
+        The streaming version of run(): each batch of decoded periods is turned into rows, added to the
+        forecast managers and written to the CSV files in the forecast store right away.
+        The CSV files are written before the forecasts can be compared with the previous ones, so only
+        the snapshot and the archive are skipped for a forecast that didn't change.
+        Errors are handled by run().
         """
-        response = requests.get(url, headers={"Cache-Control": "no-cache", "Pragma": "no-cache"}, timeout=10)
-        response.raise_for_status()  # Raises an error if request failed
-        return response.json()
-
-    def _save_daily_forecast(self, daily_forecast_data: dict) -> None:
-        """Save daily forecast data to CSV"""
-        daily_periods = daily_forecast_data["properties"]["periods"]
-
-        #opens a csv file named 'daily_forecast_data.csv' in write mode
-        with open("daily_forecast_data.csv", "w", newline ='') as daily_file:
-            #creates a list of headers
-            headers = ["forecast_period", "name", "start_time", "end_time", "isDaytime","temperature",
-                   "temperature_unit", "temperature_trend","precipitation_probability_unit",
-                   "precipitation_probability_value", "wind_speed", "wind_direction", "weather_icon_url",
-                   "short_forecast", "detailed_forecast"]
-            #creates a csv dictionary writer object using the file and fieldnames above
-            writer = csv.DictWriter(daily_file, fieldnames=headers)
+        daily_rows = []
+        hourly_manager = HourlyForecastManager(None)
+        store = self.store if self.save_csv else None
+        # The rows are hashed for change detection as they arrive, once the grid cell is known
+        delta_builders = {}
+
+        def compare(kind, gridpoint, headers, rows):
+            if self.deltas is not None:
+                if kind not in delta_builders:
+                    delta_builders[kind] = self.deltas.begin(grid_cell_key(gridpoint), kind, headers)
+                delta_builders[kind].add(rows)
+
+        with ExitStack() as files:
+            daily_csv = _StreamedCsv(store, "daily", DAILY_FORECAST_HEADERS, files)
+            hourly_csv = _StreamedCsv(store, "hourly", HOURLY_FORECAST_HEADERS, files)
+
+            def on_daily_periods(gridpoint, periods, stream):
+                rows = [daily_forecast_row(period) for period in periods]
+                daily_rows.extend(rows)
+                daily_csv.write(gridpoint, stream.generated_at, rows)
+                compare("daily", gridpoint, DAILY_FORECAST_HEADERS, rows)
+
+            def on_hourly_periods(gridpoint, periods, stream):
+                rows = [hourly_forecast_row(period) for period in periods]
+                hourly_manager.extend(rows)
+                hourly_csv.write(gridpoint, stream.generated_at, rows)
+                compare("hourly", gridpoint, HOURLY_FORECAST_HEADERS, rows)
+
+            # The CSV files are completed when this block ends, and discarded if streaming failed
+            gridpoint, daily_stream, hourly_stream = self._stream_forecasts(on_daily_periods, on_hourly_periods)
+
+        # Save the time each was generated (or current time if not provided)
+        daily_forecast_generated_time = daily_stream.generated_at or datetime.now().isoformat()
+        hourly_forecast_generated_time = hourly_stream.generated_at or datetime.now().isoformat()
+
+        # Compare the forecasts with the previous ones of the grid cell
+        daily_delta = hourly_delta = None
+        if self.deltas is not None:
+            # (this also starts the comparison of a forecast that had no periods at all)
+            compare("daily", gridpoint, DAILY_FORECAST_HEADERS, [])
+            compare("hourly", gridpoint, HOURLY_FORECAST_HEADERS, [])
+            daily_delta = delta_builders["daily"].finish()
+            hourly_delta = delta_builders["hourly"].finish()
+        self.forecasts_changed.emit(daily_delta, hourly_delta)
+        if self.skip_unchanged and _unchanged(daily_delta) and _unchanged(hourly_delta):
+            self.worker_finished.emit(
+                True, "Forecast unchanged", daily_forecast_generated_time, hourly_forecast_generated_time
+            )
+            return
+
+        daily_manager = DailyForecastManager.from_rows(daily_rows, daily_forecast_generated_time)
+        hourly_manager.set_forecast_generation_time(hourly_forecast_generated_time)
+        save_daily, save_hourly = _has_changes(daily_delta), _has_changes(hourly_delta)
+        if self.save_snapshot and save_hourly:
+            self._save_snapshot_in_background(gridpoint, hourly_forecast_generated_time, hourly_manager)
+        if self.archive is not None:
+            self._archive_in_background(gridpoint, daily_forecast_generated_time,
+                                        daily_rows if save_daily else None, hourly_forecast_generated_time,
+                                        hourly_manager if save_hourly else None)
+
+        self.forecasts_ready.emit(daily_manager, hourly_manager)
+        self.worker_finished.emit(
+            True, _fetched_message(daily_delta, hourly_delta), daily_forecast_generated_time,
+            hourly_forecast_generated_time
+        )
+
+    def _stream_forecasts(self, on_daily_periods, on_hourly_periods) -> tuple:
+        """Streams both forecasts for the location with the asyncio client (see AsyncForecastClient.stream())."""
+        return self._run_on_client(lambda client: client.stream(
+            self.location.latitude, self.location.longitude, on_daily_periods, on_hourly_periods
+        ))
+
+    def _fetch_forecasts(self) -> tuple:
+        """Fetches the gridpoint and both forecasts for the location with the asyncio client."""
+        return self._run_on_client(lambda client: client.fetch(self.location.latitude, self.location.longitude))
+
+    def _run_on_client(self, call):
+        """Runs call(client) on the client loop and waits for its result in this thread."""
+        self._future = (self.client_loop or ForecastClientLoop.shared()).submit(call)
+        try:
+            return self._future.result()
+        finally:
+            self._future = None
+
+    def cancel(self) -> None:
+        """Cancels a running fetch. Safe to call from any thread."""
+        future = self._future
+        if future is not None:
+            future.cancel()
+
+    def _save_in_background(self, kind: str, gridpoint: dict, generated_time: str, rows: list) -> None:
+        """Queues a "daily" or "hourly" CSV save on the background writer."""
+        save = self._save_daily_forecast if kind == "daily" else self._save_hourly_forecast
+        future = _csv_writer.submit(save, gridpoint, generated_time, rows)
+        future.add_done_callback(self._report_save_error)
+
+    def _save_snapshot_in_background(self, gridpoint: dict, generated_time: str,
+                                      hourly_manager: HourlyForecastManager) -> None:
+        """
+        Queues a save of the hourly snapshot on the background writer.
+        The columns are taken now, so hours the window trims before the save runs are still saved.
+        """
+        future = _csv_writer.submit(self._save_hourly_snapshot, gridpoint, generated_time,
+                                    hourly_manager.get_columns())
+        future.add_done_callback(self._report_save_error)
+
+    def _save_hourly_snapshot(self, gridpoint: dict, generated_time: str, columns) -> None:
+        """Save the hourly forecast columns as a binary snapshot"""
+        with self.store.open_for_write(gridpoint, "hourly", generated_time, SNAPSHOT_EXTENSION,
+                                       binary=True) as snapshot_file:
+            write_snapshot(snapshot_file, columns, {"generation_time": generated_time})
+
+    def _archive_in_background(self, gridpoint: dict, daily_generated_time: str, daily_rows: list,
+                               hourly_generated_time: str, hourly_manager: HourlyForecastManager) -> None:
+        """Queues appending the forecasts to the archive on the background writer; a forecast given as None is skipped."""
+        cell = grid_cell_key(gridpoint)
+        futures = []
+        if daily_rows is not None:
+            futures.append(_csv_writer.submit(self.archive.append_daily, cell, daily_generated_time, daily_rows))
+        if hourly_manager is not None:
+            futures.append(_csv_writer.submit(self.archive.append_hourly, cell, hourly_generated_time,
+                                              hourly_manager.get_columns()))
+        for future in futures:
+            future.add_done_callback(self._report_save_error)
+
+    @staticmethod
+    def _report_save_error(future) -> None:
+        # Handle file writing errors, like permission issues or missing directories
+        error = future.exception()
+        if error is not None:
+            print(f"File save failed: {str(error)}")
+
+    def _save_daily_forecast(self, gridpoint: dict, generated_time: str, daily_rows: list) -> None:
+        """Save daily forecast rows to CSV"""
+        #opens a new daily csv file for this grid cell and generation time in the forecast store
+        with self.store.open_for_write(gridpoint, "daily", generated_time) as daily_file:
+            #creates a csv dictionary writer object using the file and the daily headers
+            writer = csv.DictWriter(daily_file, fieldnames=DAILY_FORECAST_HEADERS)
             #writes headers to file
             writer.writeheader()
-            #loops through each item in daily_periods and writes it to the csv
-            for period in daily_periods:
-                writer.writerow({
-                   "forecast_period": period.get("number", ""),
-                   "name": period.get("name", ""),
-                   "start_time": period.get("startTime", ""),
-                   "end_time": period.get("endTime", ""),
-                   "isDaytime": period.get("isDaytime", ""),
-                   "temperature": period.get("temperature", ""),
-                   "temperature_unit": period.get("temperatureUnit", ""),
-                   "temperature_trend": period.get("temperatureTrend", ""),
-                   "precipitation_probability_unit": period.get("probabilityOfPrecipitation", {}).get("unitCode", ""),
-                   "precipitation_probability_value": period.get("probabilityOfPrecipitation", {}).get("value", ""),
-                   "wind_speed": period.get("windSpeed", ""),
-                  "wind_direction": period.get("windDirection", ""),
-                 "weather_icon_url": period.get("icon", ""),
-                 "short_forecast": period.get("shortForecast", ""),
-                  "detailed_forecast": period.get("detailedForecast", "")})
-
-    def _save_hourly_forecast(self, hourly_forecast_data: dict) -> None:
-        """Save hourly forecast data to CSV"""
-        hourly_periods = hourly_forecast_data["properties"]["periods"]
-
-        #Opens a CSV file named 'hourly_forecast_data.csv' in write mode.
-        with open("hourly_forecast_data.csv", "w", newline='') as hourly_file:
-            #creates a list of headers
-            headers = ["forecast_period", "start_time", "temperature", "temperature_unit",
-               "precipitation_probability_unit", "precipitation_probability_value",
-               "dewpoint_unit", "dewpoint_value", "relative_humidity_unit", "relative_humidity_value",
-              "wind_speed", "wind_direction", "weather_icon_url", "short_forecast"]
-            #creates a csv dictionary writer object using the file and fieldnames above
-            writer = csv.DictWriter(hourly_file, fieldnames=headers)
+            #writes each row to the csv
+            writer.writerows(daily_rows)
+
+    def _save_hourly_forecast(self, gridpoint: dict, generated_time: str, hourly_rows: list) -> None:
+        """Save hourly forecast rows to CSV"""
+        #Opens a new hourly CSV file for this grid cell and generation time in the forecast store.
+        with self.store.open_for_write(gridpoint, "hourly", generated_time) as hourly_file:
+            #creates a csv dictionary writer object using the file and the hourly headers
+            writer = csv.DictWriter(hourly_file, fieldnames=HOURLY_FORECAST_HEADERS)
             #writes headers to file
             writer.writeheader()
-            #loops through each item in hourly_periods and writes it to the csv
-            for period in hourly_periods:
-                writer.writerow({
-                   "forecast_period": period.get("number", ""),
-                   "start_time": period.get("startTime", ""),
-                   "temperature": period.get("temperature", ""),
-                   "temperature_unit": period.get("temperatureUnit", ""),
-                   "precipitation_probability_unit": period.get("probabilityOfPrecipitation", {}).get("unitCode", ""),
-                   "precipitation_probability_value": period.get("probabilityOfPrecipitation", {}).get("value", ""),
-                   "dewpoint_unit": period.get("dewpoint", {}).get("unitCode", ""),
-                   "dewpoint_value": period.get("dewpoint", {}).get("value", ""),
-                   "relative_humidity_unit": period.get("relativeHumidity", {}).get("unitCode", ""),
-                   "relative_humidity_value": period.get("relativeHumidity", {}).get("value", ""),
-                   "wind_speed": period.get("windSpeed", ""),
-                   "wind_direction": period.get("windDirection", ""),
-                   "weather_icon_url": period.get("icon", ""),
-                   "short_forecast": period.get("shortForecast", "")})
+            #writes each row to the csv
+            writer.writerows(hourly_rows)
+
+
+class _StreamedCsv:
+    """
+    A forecast CSV file in the store that rows are written to as they are decoded.
+    The file is opened with the first rows (when the grid cell and generation time are known) and
+    completed or discarded when the ExitStack it was opened on closes. Nothing is written without a store.
+    """
+
+    def __init__(self, store, kind, headers, files):
+        self._store = store
+        self._kind = kind
+        self._headers = headers
+        self._files = files
+        self._writer = None
+
+    def write(self, gridpoint, generated_time, rows):
+        if self._store is None:
+            return
+        if self._writer is None:
+            generated_time = generated_time or datetime.now().isoformat()
+            forecast_file = self._files.enter_context(self._store.open_for_write(gridpoint, self._kind, generated_time))
+            self._writer = csv.DictWriter(forecast_file, fieldnames=self._headers)
+            self._writer.writeheader()
+        self._writer.writerows(rows)
+
+
+def _has_changes(delta) -> bool:
+    # A forecast is saved if it changed, or if changes aren't detected at all
+    return delta is None or bool(delta)
+
+
+def _unchanged(delta) -> bool:
+    # True if a forecast is known to be the same as before, without even a period that expired
+    return delta is not None and not delta and not delta.expired
+
+
+def _fetched_message(daily_delta, hourly_delta) -> str:
+    if daily_delta is None or hourly_delta is None:
+        return "Forecast fetched"
+    return f"Forecast fetched (daily: {daily_delta}; hourly: {hourly_delta})"
 
 
 def main():
@@ -178,6 +381,7 @@ def main():
 
     worker.start()
     app.exec_()
+    ForecastClientLoop.close_shared()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+import re
+import threading
+import time
+from geopy.location import Location
+from atomic_file import load_json, save_json
+
+# Places don't move, so found locations are kept for 90 days
+DEFAULT_TTL_SECONDS = 90 * 24 * 60 * 60
+
+
+def normalize_query(query):
+    """
+    Returns the cache key of a search query: case folded, with punctuation and repeated spaces removed,
+    so "Raleigh, NC" and "  raleigh nc" are the same query.
+    """
+    return " ".join(re.sub(r"[\W_]+", " ", query.casefold()).split())
+
+
+def location_to_dict(location):
+    """Returns the JSON serializable parts of a geopy Location."""
+    return {
+        "address": location.address,
+        "latitude": location.latitude,
+        "longitude": location.longitude,
+        "altitude": location.altitude,
+        "raw": location.raw,
+    }
+
+
+def location_from_dict(entry):
+    """Rebuilds a geopy Location from location_to_dict()."""
+    return Location(entry["address"], (entry["latitude"], entry["longitude"], entry["altitude"]), entry["raw"])
+
+
+class GeocodeCache:
+    """
+    A persistent store of geocoding results.
+
+    Maps a normalized search query to the location it was found at, so a repeated search is answered
+    without a request to the geocoder (and works offline).
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, file="geocode_cache.json", ttl=DEFAULT_TTL_SECONDS):
+        self._file = file
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = load_json(self._file, {})
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide cache used by GeolocatorService."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, query):
+        """Returns the cached geopy Location of a query, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(normalize_query(query))
+        if entry is None or time.time() - entry["stored_at"] > self._ttl:
+            return None
+        return location_from_dict(entry)
+
+    def put(self, query, location):
+        """Stores the location a query was found at."""
+        entry = location_to_dict(location)
+        entry["stored_at"] = time.time()
+        with self._lock:
+            self._entries[normalize_query(query)] = entry
+            self._save()
+
+    def invalidate(self, query):
+        with self._lock:
+            if self._entries.pop(normalize_query(query), None) is not None:
+                self._save()
+
+    def _save(self):
+        try:
+            save_json(self._file, self._entries)
+        except OSError as e:
+            print(f"Geocode cache save failed: {e}")
@@ -0,0 +1,23 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from geolocator import GeolocatorService
+
+
+"""
+A worker that looks up a search query with the geocoder in the background,
+so the window doesn't freeze while the geocoder is asked.
+"""
+class GeocodeWorker(QThread):
+    """
+    Emitted when the lookup is done, with the search query and the location found for it
+    (None if it wasn't found or the geocoder failed).
+    """
+    geocode_finished = pyqtSignal(str, object)
+
+    def __init__(self, query: str, geo_service: GeolocatorService) -> None:
+        super().__init__()
+        self.query = query
+        self.geo_service = geo_service
+
+    def run(self) -> None:
+        location = self.geo_service.get_location(self.query)
+        self.geocode_finished.emit(self.query, location)
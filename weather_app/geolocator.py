@@ -1,16 +1,49 @@
 from geopy import Nominatim
+from geocode_cache import GeocodeCache
 
 
 class GeolocatorService:
-    """Handles geolocation queries using geopy."""
+    """
+    Handles geolocation queries using geopy.
+    Found locations are kept in a persistent cache, so a repeated query doesn't reach the geocoder.
 
-    def __init__(self):
-        self.geolocator = Nominatim(user_agent="weather_app")
+    Any geopy geocoder (or a stand-in with a geocode(query) method) can be passed in place of Nominatim.
+    """
+
+    def __init__(self, geocoder=None, cache=None):
+        self.geolocator = geocoder if geocoder is not None else Nominatim(user_agent="weather_app")
+        self.cache = cache if cache is not None else GeocodeCache.shared()
+
+    def get_cached_location(self, query):
+        """Returns the cached location of a query without contacting the geocoder, or None if it isn't cached."""
+        return self.cache.get(query)
+
+    def lookup(self, query, store=True):
+        """
+        Returns the location of a query (None if it wasn't found), from the cache or else from the geocoder.
+        Unlike get_location(), geocoder errors are raised. A found location is cached if store is set.
+        """
+        location = self.cache.get(query)
+        if location is not None:
+            return location
+        location = self.geolocator.geocode(query)
+        if location is not None and store:
+            self.cache.put(query, location)
+        return location
 
     def get_location(self, query):
         """Returns a location object from a search query."""
         try:
-            return self.geolocator.geocode(query)
+            return self.lookup(query)
         except Exception as e:
             print(f"Geocoder error: {e}")
             return None
+
+    def geocode_many(self, queries, checkpoint_file=None, requests_per_second=1.0):
+        """
+        Geocodes many queries, yielding a GeocodeResult for each as it is done (see BatchGeocoder).
+        Nominatim's usage policy allows at most one request per second.
+        """
+        from batch_geocoder import BatchGeocoder
+        return BatchGeocoder(self, requests_per_second=requests_per_second,
+                             checkpoint_file=checkpoint_file).geocode(queries)
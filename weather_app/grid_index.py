@@ -0,0 +1,82 @@
+import math
+
+# Buckets are 0.05 degrees on a side (about 5 km), a little larger than a 2.5 km NWS grid cell,
+# so a cell usually sits in one to four buckets
+DEFAULT_BUCKET_SIZE = 0.05
+
+
+class GridIndex:
+    """
+    A spatial index of NWS grid cells, for finding the known cell a coordinate falls inside without the API.
+
+    Each cell is added under a key with the polygon it covers (the outer ring of the "geometry" of a
+    gridpoint forecast response, as [longitude, latitude] pairs). The cells are kept in fixed size
+    latitude/longitude buckets, so a lookup only tests the few polygons in one bucket.
+    """
+
+    def __init__(self, bucket_size=DEFAULT_BUCKET_SIZE):
+        self._bucket_size = bucket_size
+        self._cells = {}    # key -> (bounding box, ring)
+        self._buckets = {}  # (row, column) -> keys of the cells overlapping it
+
+    def __len__(self):
+        return len(self._cells)
+
+    def add(self, key, ring):
+        """Adds (or replaces) the cell of a key."""
+        self.remove(key)
+        longitudes = [point[0] for point in ring]
+        latitudes = [point[1] for point in ring]
+        bounds = (min(latitudes), min(longitudes), max(latitudes), max(longitudes))
+        self._cells[key] = (bounds, ring)
+        for bucket in self._buckets_of(bounds):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    def remove(self, key):
+        cell = self._cells.pop(key, None)
+        if cell is None:
+            return
+        for bucket in self._buckets_of(cell[0]):
+            keys = self._buckets.get(bucket)
+            if keys and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def find(self, latitude, longitude):
+        """Returns the key of a cell the coordinate falls inside, or None if it isn't in a known cell."""
+        bucket = (math.floor(latitude / self._bucket_size), math.floor(longitude / self._bucket_size))
+        for key in self._buckets.get(bucket, ()):
+            (south, west, north, east), ring = self._cells[key]
+            if south <= latitude <= north and west <= longitude <= east \
+                    and point_in_polygon(latitude, longitude, ring):
+                return key
+        return None
+
+    def _buckets_of(self, bounds):
+        south, west, north, east = bounds
+        for row in range(math.floor(south / self._bucket_size), math.floor(north / self._bucket_size) + 1):
+            for column in range(math.floor(west / self._bucket_size), math.floor(east / self._bucket_size) + 1):
+                yield row, column
+
+
+def point_in_polygon(latitude, longitude, ring):
+    """Returns whether a coordinate is inside a polygon ring of [longitude, latitude] pairs (ray casting)."""
+    inside = False
+    count = len(ring)
+    for index in range(count):
+        x1, y1 = ring[index][0], ring[index][1]
+        x2, y2 = ring[index - 1][0], ring[index - 1][1]
+        if (y1 > latitude) != (y2 > latitude):
+            crossing = x1 + (latitude - y1) * (x2 - x1) / (y2 - y1)
+            if longitude < crossing:
+                inside = not inside
+    return inside
+
+
+def polygon_ring(forecast_data):
+    """Returns the outer ring of the grid cell polygon of a gridpoint forecast response, or None if it has none."""
+    geometry = (forecast_data or {}).get("geometry") or {}
+    if geometry.get("type") != "Polygon" or not geometry.get("coordinates"):
+        return None
+    return [[point[0], point[1]] for point in geometry["coordinates"][0]]
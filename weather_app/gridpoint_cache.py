@@ -0,0 +1,128 @@
+import threading
+import time
+from atomic_file import load_json, save_json
+from grid_index import GridIndex, polygon_ring
+
+# A coordinate's forecast office and grid cell almost never change, so entries are kept for 30 days
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+
+
+def grid_cell_key(gridpoint):
+    """Returns a key identifying the NWS grid cell of a gridpoint, e.g. "OKX/33,35"."""
+    return f"{gridpoint['gridId']}/{gridpoint['gridX']},{gridpoint['gridY']}"
+
+
+class GridpointCache:
+    """
+    A persistent store of /points lookups.
+
+    Maps a latitude/longitude (rounded to 4 decimal places, as ForecastWorker does) to the
+    forecast and forecastHourly URLs and the grid cell they belong to.
+
+    Once a forecast of an entry has been fetched, the polygon of its grid cell is stored with it
+    (see remember_polygon). A coordinate that isn't cached itself but falls inside a known cell
+    is then answered with that cell's entry, through a GridIndex of the polygons.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, file="gridpoint_cache.json", ttl=DEFAULT_TTL_SECONDS):
+        self._file = file
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = load_json(self._file, {})
+        self._index = None
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide cache used by AsyncForecastClient."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, latitude, longitude):
+        """
+        Returns the cached gridpoint for a coordinate, or None if it is missing or expired.
+        A coordinate that isn't cached gets the entry of a known grid cell it falls inside.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(latitude, longitude))
+            if entry is None or self._expired(entry):
+                cell_key = self._grid_index().find(latitude, longitude)
+                entry = self._entries.get(cell_key) if cell_key is not None else None
+        if entry is None or self._expired(entry):
+            return None
+        return entry
+
+    def put(self, latitude, longitude, points_properties):
+        """Stores the interesting parts of a /points response's "properties" and returns the new entry."""
+        entry = {
+            "forecast": points_properties["forecast"],
+            "forecastHourly": points_properties["forecastHourly"],
+            "gridId": points_properties.get("gridId", ""),
+            "gridX": points_properties.get("gridX", ""),
+            "gridY": points_properties.get("gridY", ""),
+            "stored_at": time.time(),
+        }
+        key = self._key(latitude, longitude)
+        with self._lock:
+            self._entries[key] = entry
+            if self._index is not None:
+                self._index.remove(key)
+            self._save()
+        return entry
+
+    def remember_polygon(self, latitude, longitude, forecast_data):
+        """
+        Stores the grid cell polygon of a forecast response with the entry of a coordinate,
+        if the entry doesn't have one yet.
+        """
+        ring = polygon_ring(forecast_data)
+        if ring is None:
+            return
+        key = self._key(latitude, longitude)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.get("polygon"):
+                return
+            entry["polygon"] = ring
+            if self._index is not None:
+                self._index.add(key, ring)
+            self._save()
+
+    def invalidate(self, latitude, longitude):
+        """
+        Forgets a coordinate, e.g. after one of its forecast URLs returned 404.
+        The entry of the grid cell it was answered from is forgotten too.
+        """
+        with self._lock:
+            keys = {self._key(latitude, longitude), self._grid_index().find(latitude, longitude)}
+            removed = [key for key in keys if key is not None and self._entries.pop(key, None) is not None]
+            for key in removed:
+                self._index.remove(key)
+            if removed:
+                self._save()
+
+    def _expired(self, entry):
+        return time.time() - entry["stored_at"] > self._ttl
+
+    def _grid_index(self):
+        # Built the first time it is needed, from the entries that have a polygon
+        if self._index is None:
+            self._index = GridIndex()
+            for key, entry in self._entries.items():
+                if entry.get("polygon"):
+                    self._index.add(key, entry["polygon"])
+        return self._index
+
+    @staticmethod
+    def _key(latitude, longitude):
+        return f"{round(latitude, 4)},{round(longitude, 4)}"
+
+    def _save(self):
+        try:
+            save_json(self._file, self._entries)
+        except OSError as e:
+            print(f"Gridpoint cache save failed: {e}")
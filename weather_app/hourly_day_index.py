@@ -0,0 +1,107 @@
+import math
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+from icon_resolver import IconResolver
+
+_EPOCH_DATE = date(1970, 1, 1)
+_DAY = 24 * 60 * 60
+_HOUR = 60 * 60
+
+# The summary of one local date of an hourly forecast. first and last are the row indexes of its first hour and
+# past its last one; a value is None if none of the day's hours have it. condition is the icon condition code
+# most of the day's hours have (see IconResolver), and icon_url the icon of the first of those hours.
+DaySummary = namedtuple("DaySummary", ["date", "first", "last", "min_temperature", "max_temperature",
+                                       "mean_temperature", "max_precipitation_probability", "condition",
+                                       "icon_url"])
+
+
+class HourlyDayIndex:
+    """
+    An index of the days in HourlyForecastColumns, built once in one pass over the columns.
+
+    The hours are grouped by the local date of their start time, one summary per date. day() returns
+    the precomputed summary of a date with a dict lookup, and hour_at() finds the hour containing an instant
+    with a binary search of the start times.
+    """
+
+    def __init__(self, columns, resolver=None):
+        self._columns = columns
+        self._resolver = resolver or IconResolver.shared()
+        self.days = []
+        self._by_date = {}
+        self._build()
+
+    def day(self, day):
+        """Returns the DaySummary of a local date, or None if the forecast doesn't cover it."""
+        return self._by_date.get(day)
+
+    def hour_at(self, instant):
+        """
+        Returns the row index of the hour containing an instant (epoch seconds or an aware datetime),
+        or None if no hour of the forecast covers it.
+        """
+        if isinstance(instant, datetime):
+            instant = instant.timestamp()
+        start_times = self._columns.start_time
+        index = bisect_right(start_times, instant) - 1
+        if index < 0:
+            return None
+        end = start_times[index] + _HOUR
+        if index + 1 < len(start_times):
+            end = min(end, start_times[index + 1])
+        return index if instant < end else None
+
+    def day_at(self, instant):
+        """Returns the DaySummary of the day containing an instant, or None."""
+        index = self.hour_at(instant)
+        if index is None:
+            return None
+        return self.day(self._date(index))
+
+    def _build(self):
+        # Groups the row indexes by local date
+        by_date = {}
+        for index in range(len(self._columns)):
+            by_date.setdefault(self._date(index), []).append(index)
+        for day in sorted(by_date):
+            self._add_day(day, by_date[day])
+
+    def _add_day(self, day, indexes):
+        columns = self._columns
+        temperatures = [value for value in map(columns.temperature.__getitem__, indexes) if not math.isnan(value)]
+        probabilities = [value for value in map(columns.precipitation_probability.__getitem__, indexes)
+                         if not math.isnan(value)]
+
+        # Count the icons by their string table index, so each distinct icon URL is only parsed once
+        icons = Counter(map(columns.weather_icon_url.__getitem__, indexes))
+        conditions = Counter()
+        icon_urls = {}
+        for string_index in icons:
+            url = columns.strings()[string_index]
+            icon = self._resolver.parse(url)
+            if icon is None:
+                continue
+            code = icon.conditions[0].code
+            conditions[code] += icons[string_index]
+            icon_urls.setdefault(code, url)
+        condition = conditions.most_common(1)[0][0] if conditions else None
+
+        summary = DaySummary(
+            day, indexes[0], indexes[-1] + 1,
+            min(temperatures) if temperatures else None,
+            max(temperatures) if temperatures else None,
+            math.fsum(temperatures) / len(temperatures) if temperatures else None,
+            max(probabilities) if probabilities else None,
+            condition, icon_urls.get(condition)
+        )
+        self.days.append(summary)
+        self._by_date[summary.date] = summary
+
+    def _date(self, index):
+        return _local_date(self._columns.start_time[index], self._columns.utc_offset[index])
+
+
+def _local_date(epoch, utc_offset):
+    # The date in the time zone of the forecast, without building a datetime
+    return _EPOCH_DATE + timedelta(days=(epoch + utc_offset) // _DAY)
@@ -1,95 +1,20 @@
-#import the datetime library from the datetime module
-from datetime import datetime
-
-#conversion function for Fahrenheit to Celsius (takes a float and returns a float)
-def fahrenheit_to_celsius(fahrenheit):
-    celsius = (fahrenheit - 32) * 5 / 9
-    return celsius
-
-#conversion function for Celsius to Fahrenheit (takes a float and returns a float)
-def celsius_to_fahrenheit(celsius):
-    fahrenheit = (celsius * 9 / 5) + 32
-    return fahrenheit
+import math
+from cached_display import cached_display
+from icon_resolver import IconResolver
+from iso_time import date_label, hour_label
+#the conversion functions are shared with the daily forecast and the column loaders
+from unit_conversion import fahrenheit_to_celsius
 
 #define a method that gets the appropriate weather emoji from a forecast's icon
+#The method will be passed a url. If there is no url, an empty string is returned,
+#and a question mark if the icon's (first) condition has no emoji.
+#The icon resolver parses the url and looks the condition up in its prebuilt table, caching the result per url.
 def get_emoji(url):
-    #parse the url parameter
-    #The method will be passed a url. If there is no url, an empty string should be returned.
-    if not url:
-        return ""
-    # Retrieve the base of the url by using the split operation
-    url_base = url.split('?')[0]
-    #split the base into parts, each of which will be separated by forward slash('/').
-    base_parts = url_base.split('/')
-
-    # Extract the weather condition from the parts. It will be the last element (hint: there's an easy way
-    # to find this in Python). Make sure the condition is in lower case for consistent results.
-    if not base_parts:
-        return ""
-
-    weather_condition = base_parts[-1].lower()
-
-    #Check for multiple conditions
-    # the condition may actually be a list of conditions separated by commas. If so, we will consider only
-    # the first condition relevant. So it should be extracted.
-    if ',' in weather_condition:
-        weather_condition = weather_condition.split(',')[0]
-
-    #Create a dictionary to map icons to emojis (provided below because I don't hate you)
-    mapping = {
-        "skc": "☀️",  # clear sky
-        "few": "🌤️",  # few clouds
-        "sct": "⛅",  # scattered clouds
-        "bkn": "☁️",  # broken clouds
-        "ovc": "☁️",  # overcast
-        "sn": "❄️",  # snow
-        "ra_sn": "🌨️",  # rain and snow mix
-        "raip": "🌧️",  # rain with ice pellets
-        "fzra": "🌧️",  # freezing rain
-        "ra_fzra": "🌧️",  # rain/freezing rain mix
-        "fzra_sn": "🌨️",  # freezing rain and snow
-        "ip": "🧊",  # ice pellets
-        "snip": "❄️",  # snow pellets
-        "minus_ra": "🌦️",  # light rain
-        "ra": "🌧️",  # rain
-        "shra": "🌧️",  # showers
-        "hi_shwrs": "🌧️",  # heavy showers
-        "tsra": "⛈️",  # thunderstorms
-        "scttsra": "⛈️",  # scattered thunderstorms
-        "hi_tsra": "⛈️",  # heavy thunderstorms
-        "fc": "🌪️",  # funnel cloud
-        "tor": "🌪️",  # tornado
-        "hur_warn": "🌀",  # hurricane warning
-        "hur_watch": "🌀",  # hurricane watch
-        "ts_warn": "⛈️",  # thunderstorm warning
-        "ts_watch": "⛈️",  # thunderstorm watch
-        "ts_nowarn": "⛈️",  # thunderstorm, no warning
-        "wind_skc": "🌬️",  # clear with wind
-        "wind_few": "🌬️",  # few clouds with wind
-        "wind_sct": "🌬️",  # scattered clouds with wind
-        "wind_bkn": "🌬️",  # broken clouds with wind
-        "wind_ovc": "🌬️",  # overcast with wind
-        "du": "🌫️",  # dust
-        "fu": "🌫️",  # smoke/fugitive dust
-        "hz": "🌫️",  # haze
-        "hot": "🥵",  # hot
-        "cold": "🥶",  # cold
-        "blizzard": "🌨️",  # blizzard
-        "fg": "🌫️",  # fog
-    }
-
-    #Find correct emoji for current condition
-    # For each key/value pair in the dictionary, see if the key is in the condition.
-    # If so, return that emoji; otherwise, return a question mark.
-    for key, value in mapping.items():
-        if key in weather_condition:
-            return value
-
-        return "?"
+    return IconResolver.shared().emoji(url)
 
 
 """
-A class representing a single hourly forecast period with formatted data.
+A class representing a single hourly forecast period.
 The class should contain:
     - forecast period
     - start time
@@ -101,156 +26,104 @@ The class should contain:
     - the wind conditions
     - the weather icon url
     - a short forecast description
+
+The object only holds the raw values (numbers in Fahrenheit / percent, NaN when missing, and the start time
+as epoch seconds plus its UTC offset). The display strings used by the ui are built the first time they are
+read and then cached. __slots__ keeps each object small, since there is one per forecast hour.
 """
 #implement the Hourly Forecast Class
 class HourlyForecast:
-    def __init__(self, forecast_period, formatted_date, forecast_hour, temperature_fahrenheit, temperature_celsius,
-                 chance_of_rain, dewpoint_fahrenheit, dewpoint_celsius, relative_humidity, wind, weather_icon, short_forecast):
-        self._forecast_period = forecast_period
-        self._formatted_date = formatted_date
-        self._forecast_hour = forecast_hour
-        self._temperature_fahrenheit = temperature_fahrenheit
-        self._temperature_celsius = temperature_celsius
-        self._chance_of_rain = chance_of_rain
-        self._dewpoint_fahrenheit = dewpoint_fahrenheit
-        self._dewpoint_celsius = dewpoint_celsius
-        self._relative_humidity = relative_humidity
-        self._wind = wind
-        self._weather_icon = weather_icon
-        self._short_forecast = short_forecast
-
-
-    # TODO: create a method theat will convert data from a dictionary to an Hourly Forecast Object
+    __slots__ = ("forecast_period", "start_time", "utc_offset", "temperature", "dewpoint", "humidity",
+                 "precipitation_probability", "wind_speed", "wind_direction", "icon_url", "short_forecast",
+                 # caches of the display strings
+                 "_formatted_date", "_forecast_hour", "_temperature_fahrenheit", "_temperature_celsius",
+                 "_chance_of_rain", "_dewpoint_fahrenheit", "_dewpoint_celsius", "_relative_humidity", "_wind",
+                 "_weather_icon")
+
+    def __init__(self, forecast_period, start_time, utc_offset, temperature, dewpoint, humidity,
+                 precipitation_probability, wind_speed, wind_direction, icon_url, short_forecast):
+        self.forecast_period = forecast_period
+        self.start_time = start_time
+        self.utc_offset = utc_offset
+        self.temperature = temperature
+        self.dewpoint = dewpoint
+        self.humidity = humidity
+        self.precipitation_probability = precipitation_probability
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.icon_url = icon_url
+        self.short_forecast = short_forecast
+
+    # display strings used by the ui
+
+    # format start time
+    # if there is not start time, the formatted date and forecast hour should both be set to "N/A"
+    #   formatted date = date/time.strftime("%A, %b %d")  # e.g., "Wednesday, Feb 26"
+    #   forecast hour = date/time.strftime("%I:%M %p")
+    # the labels are memoized per local date and time of day (see iso_time.py), so each is only formatted once
+    @cached_display
+    def formatted_date(self):
+        return "N/A" if self.start_time is None else date_label(self.start_time, self.utc_offset)
+
+    @cached_display
+    def forecast_hour(self):
+        return "N/A" if self.start_time is None else hour_label(self.start_time, self.utc_offset)
+
+    # format temperature
+    # If the temperature is missing, set the values to "N/A"
+    # Here's the degree symbol for your convenience: °
+    @cached_display
+    def temperature_fahrenheit(self):
+        return "N/A" if math.isnan(self.temperature) else f"{self.temperature:.1f}°F"
+
+    @cached_display
+    def temperature_celsius(self):
+        return "N/A" if math.isnan(self.temperature) else f"{fahrenheit_to_celsius(self.temperature):.1f}°C"
+
+    # format precipitation
+    # if it isn't populated, set to 0
+    # then format in the following manner: "💧chance%" (copy and paste the icon)
+    @cached_display
+    def chance_of_rain(self):
+        chance = 0 if math.isnan(self.precipitation_probability) else int(self.precipitation_probability)
+        return f"💧{chance}%"
+
+    # format dewpoint
+    # If it isn't populated set both F and C dewpoints to "N/A"
+    @cached_display
+    def dewpoint_fahrenheit(self):
+        return "N/A" if math.isnan(self.dewpoint) else f"{self.dewpoint:.1f}°F"
+
+    @cached_display
+    def dewpoint_celsius(self):
+        return "N/A" if math.isnan(self.dewpoint) else f"{fahrenheit_to_celsius(self.dewpoint):.1f}°C"
+
+    # format humidity
+    # If populated, follow the value with a percent sign. Otherwise, set to "N/A".
+    @cached_display
+    def relative_humidity(self):
+        return "N/A" if math.isnan(self.humidity) else f"{self.humidity:.0f}%"
+
+    # format wind conditions
+    # If populated, format "speed direction". Otherwise, set to "N/A".
+    @cached_display
+    def wind(self):
+        if self.wind_speed and self.wind_direction:
+            return f"{self.wind_speed.strip()} {self.wind_direction.strip().upper()}"
+        return "N/A"
+
+    # Get emoji to represent weather icon
+    @cached_display
+    def weather_icon(self):
+        return get_emoji(self.icon_url)
+
+    # create a method that will convert data from a dictionary (a row of the hourly csv file,
+    # see forecast_rows.py) to an Hourly Forecast Object
+    # the row is parsed by the same code as whole columns of rows (see hourly_forecast_columns.py),
+    # so a single row gets the same values and the same rules for missing values and units;
+    # like there, a row without a valid start time gives no forecast (None)
     @staticmethod
     def data_to_objects(data):
-        # extract each attribute from the dictionary parameter
-        # the start time in the dictionary will initially contain both the time and the date. These
-        # will need separated based on the value in the start time.
-        start_time_raw = data.get('start_time')
-
-        # format start time
-        # if there is not start time, the formatted date and forecast hour should both be set to "N/A"
-        # otherwise, try to use the following line to extract the start time properly formatted:
-        #   date/time = datetime.fromisoformat(start time)
-        # then use the following lines to extract the date and hour:
-        #   formatted date = date/time.strftime("%A, %b %d")  # e.g., "Wednesday, Feb 26"
-        #   forecast hour = date/time.strftime("%I:%M %p")
-        # If that fails, expect a value error and set both date and hour to "N/A"
-        if start_time_raw:
-            try:
-                date_time = datetime.fromisoformat(start_time_raw)
-                formatted_date = date_time.strftime("%A, %b %d")
-                forecast_hour = date_time.strftime("%I:%M %p")
-            except ValueError:
-                formatted_date = "N/A"
-                forecast_hour = "N/A"
-
-
-
-        # format temperature
-        # For the temperature units, make sure to strip extra spaces and capitalize the letter (C or F)
-        # If either the temperature value or unit is not populated, set the values to "N/A"
-        # Otherwise, try converting the temperature from strings to floats
-        # then convert to populate the other temperature unit (if it's F convert to C, and vice versa)
-        # Here's the degree symbol for your convenience: °
-        temperature_fahrenheit = "N/A"
-        temperature_celsius = "N/A"
-        temperature_str = data.get('temperature')
-        temperature_unit_raw = data.get('temperature_unit')
-        if temperature_str is not None and temperature_unit_raw:
-            unit = temperature_unit_raw.strip().upper()
-            try:
-                temp_value = float(temperature_str)
-                if unit == 'F':
-                    temperature_fahrenheit = f"{temp_value}°F"
-                    temperature_celsius = f"{fahrenheit_to_celsius(temp_value):.1f}°C"
-                elif unit == 'C':
-                    temperature_celsius = f"{temp_value}°C"
-                    temperature_fahrenheit = f"{celsius_to_fahrenheit(temp_value):.1f}°F"
-            except ValueError:
-                pass
-
-    
-        # format precipitation
-        # make sure to strip additional spaces, if it isn't populated, set to 0
-        # then format in the following manner: "💧chance%" (copy and paste the icon)
-        chance_of_rain = "💧0%"
-        precip_prob_str = data.get('precipitation_probability_value')
-        if precip_prob_str is not None:
-            try:
-                prob = int(precip_prob_str)
-                chance_of_rain = f"💧{prob}%"
-            except ValueError:
-                pass
-
-        # format dewpoint
-        # Extract the dewpoint and unit making sure to strip spaces and capitolize.
-        # If neither is populated set both F and C dewpoints to "N/A"
-        # Otherwise, try to cast the dewpoint as a float.
-        # Then convert to populate the other temperature unit (if it's F convert to C, and vice versa)
-        # Expect the dewpoint using to be either "WMOUNIT:DEGC" or "WMOUNIT:DEGF"
-        dewpoint_fahrenheit = "N/A"
-        dewpoint_celsius = "N/A"
-        detailed_forecast = data.get('detailed_forecast')
-        if detailed_forecast:
-            dew_f_val = None
-            dew_c_val = None
-            f_start = detailed_forecast.find("dewpoint around ")
-            if f_start != -1:
-                f_end = detailed_forecast.find(" F", f_start)
-                if f_end != -1:
-                    try:
-                        dew_f_val = float(detailed_forecast[f_start + 16:f_end])
-                        dewpoint_fahrenheit = f"{dew_f_val}°F"
-                        dewpoint_celsius = f"{fahrenheit_to_celsius(dew_f_val):.1f}°C"
-                    except ValueError:
-                        pass
-
-            c_start = detailed_forecast.find("dewpoint around ")
-            if c_start != -1:
-                c_end = detailed_forecast.find(" C", c_start)
-                if c_end != -1:
-                    try:
-                        dew_c_val = float(detailed_forecast[c_start + 16:c_end])
-                        dewpoint_celsius = f"{dew_c_val}°C"
-                        dewpoint_fahrenheit = f"{celsius_to_fahrenheit(dew_c_val):.1f}°F"
-                    except ValueError:
-                        pass
-
-        # TODO: format humitify
-        # Extract the humitity probability percent. If populated, follow the value with a percent sign.
-        # Otherwise, set to "N/A".
-        relative_humidity = "N/A"
-        if detailed_forecast:
-            hum_start = detailed_forecast.find('humidity ')
-            if hum_start != -1:
-                hum_end = detailed_forecast.find("%", hum_start)
-                if hum_end != -1:
-                    try:
-                        relative_humidity = detailed_forecast[hum_start:hum_end+1]
-                    except ValueError:
-                        pass
-
-        # format wind conditions
-        # Extract the wind speed and direction. If populated, string the direction and format "speed direction".
-        # Otherwise, set to "N/A".
-        wind = "N/A"
-        wind_speed = data.get('wind_speed')
-        wind_direction = data.get('wind_direction')
-        if wind_speed and wind_direction:
-            speed = wind_speed.strip()
-            direction = wind_direction.strip().upper()
-            wind = f"{speed} {direction}"
-
-        # Get emoji to represent weather icon
-        # Extract the url and icon
-        weather_icon = get_emoji(data.get('weather_icon_url'))
-        short_forecast = data.get('short_forecast')
-        forecast_period = data.get('forecast_period')
-
-        # return an Hourly Forecast Object with the values extracted above
-        return HourlyForecast(
-            forecast_period, formatted_date, forecast_hour, temperature_fahrenheit, temperature_celsius,
-            chance_of_rain, dewpoint_fahrenheit, dewpoint_celsius, relative_humidity, wind, weather_icon, short_forecast
-        )
-
+        from hourly_forecast_columns import HourlyForecastColumns
+        columns = HourlyForecastColumns.from_rows([data])
+        return columns.forecast(0) if len(columns) else None
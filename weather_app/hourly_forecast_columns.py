@@ -0,0 +1,208 @@
+import math
+import operator
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from hourly_forecast_class import HourlyForecast
+from iso_time import format_iso, parse_iso
+from unit_conversion import parse_numbers, parse_wind_speeds, temperatures_to_fahrenheit
+
+# The numeric columns, all stored as float64 with NaN for a missing value.
+# Temperatures are in Fahrenheit, probabilities and humidity in percent and wind speed in mph
+# (the top of the range for speeds like "5 to 10 mph").
+NUMERIC_COLUMNS = ("temperature", "dewpoint", "relative_humidity", "precipitation_probability", "wind_speed")
+
+# The text columns. Their values repeat a lot, so each distinct string is stored once in a string table
+# and the column only holds indexes into it.
+TEXT_COLUMNS = ("wind_speed_text", "wind_direction", "weather_icon_url", "short_forecast")
+
+# The array type code of every column. The types have the same size on every platform,
+# since this is also the layout of a binary snapshot (see forecast_snapshot.py).
+COLUMN_TYPES = ((("forecast_period", "i"), ("start_time", "q"), ("utc_offset", "i"))
+                + tuple((name, "d") for name in NUMERIC_COLUMNS)
+                + tuple((name, "I") for name in TEXT_COLUMNS))
+
+_COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq}
+
+
+class HourlyForecastColumns:
+    """
+    A columnar store of hourly forecast periods: one typed array per field instead of one object per hour.
+
+    Start times are kept as epoch seconds plus the UTC offset they were given in, so the local date and hour
+    can still be shown. The rows are in time order, which time_range() relies on, so an hour without a (valid)
+    start time is left out: it can't be put in order or looked up by time. Display strings are only produced by the HourlyForecast records forecast() builds.
+    """
+
+    def __init__(self):
+        for name, type_code in COLUMN_TYPES:
+            setattr(self, name, array(type_code))
+        self._strings = []
+        self._string_indexes = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds the columns from hourly forecast rows (see forecast_rows.py or the hourly CSV file)."""
+        columns = cls()
+        columns.extend(rows)
+        return columns
+
+    @classmethod
+    def from_buffers(cls, buffers, strings):
+        """
+        Builds columns over existing buffers without copying them, e.g. memoryviews into a memory-mapped snapshot.
+        buffers maps each column name to a sequence of its COLUMN_TYPES type (e.g. a cast memoryview) and
+        strings is the string table. The buffers are only copied into arrays if rows are added later.
+        """
+        columns = cls.__new__(cls)
+        for name, _ in COLUMN_TYPES:
+            setattr(columns, name, buffers[name])
+        columns._strings = list(strings)
+        columns._string_indexes = None
+        return columns
+
+    def strings(self):
+        """Returns the string table the text columns index into."""
+        return self._strings
+
+    def append_row(self, row):
+        """Adds one hourly forecast row. Empty strings and None are both treated as missing."""
+        self.extend([row])
+
+    def extend(self, rows):
+        """
+        Adds many hourly forecast rows at once.
+        Each field is pulled out of the rows and then parsed and converted a whole column at a time.
+        """
+        rows = list(rows)
+        if self._string_indexes is None:
+            self._copy_buffers()
+
+        def field(name):
+            return [row.get(name) for row in rows]
+
+        start_times = list(map(parse_iso, field("start_time")))
+        if None in start_times:
+            rows = [row for row, start_time in zip(rows, start_times) if start_time is not None]
+            start_times = [start_time for start_time in start_times if start_time is not None]
+        self.forecast_period.extend(0 if math.isnan(value) else int(value)
+                                    for value in parse_numbers(field("forecast_period")))
+        self.start_time.extend(list(map(itemgetter(0), start_times)))
+        self.utc_offset.extend(list(map(itemgetter(1), start_times)))
+
+        self.temperature.extend(temperatures_to_fahrenheit(field("temperature"), field("temperature_unit")))
+        self.dewpoint.extend(temperatures_to_fahrenheit(field("dewpoint_value"), field("dewpoint_unit")))
+        self.relative_humidity.extend(parse_numbers(field("relative_humidity_value")))
+        self.precipitation_probability.extend(parse_numbers(field("precipitation_probability_value")))
+        wind_speed_texts = field("wind_speed")
+        self.wind_speed.extend(parse_wind_speeds(wind_speed_texts)[1])
+
+        self.wind_speed_text.extend(self._intern_column(wind_speed_texts))
+        self.wind_direction.extend(self._intern_column(field("wind_direction")))
+        self.weather_icon_url.extend(self._intern_column(field("weather_icon_url")))
+        self.short_forecast.extend(self._intern_column(field("short_forecast")))
+
+    def without_first(self, count):
+        """
+        Returns new columns without the first `count` rows, e.g. the hours that are over. These columns are left
+        as they are, so they can still be read by another thread (e.g. a background save). The string table is copied.
+        """
+        columns = HourlyForecastColumns.__new__(HourlyForecastColumns)
+        for name, type_code in COLUMN_TYPES:
+            setattr(columns, name, array(type_code, getattr(self, name)[max(count, 0):]))
+        columns._strings = list(self._strings)
+        columns._string_indexes = {value: index for index, value in enumerate(columns._strings)}
+        return columns
+
+    def __len__(self):
+        return len(self.start_time)
+
+    def text(self, name, index):
+        """Returns the value of a text column for one row."""
+        return self._strings[getattr(self, name)[index]]
+
+    def time_range(self, start=None, end=None):
+        """Returns the (first, past last) row indexes of the hours starting in [start, end) (epoch seconds)."""
+        first = 0 if start is None else bisect_left(self.start_time, start)
+        last = len(self) if end is None else bisect_left(self.start_time, end)
+        return first, max(first, last)
+
+    def values(self, name, start=None, end=None):
+        """Returns the non-missing values of a numeric column, optionally limited to a time range."""
+        first, last = self.time_range(start, end)
+        return [value for value in getattr(self, name)[first:last] if not math.isnan(value)]
+
+    def minimum(self, name, start=None, end=None):
+        values = self.values(name, start, end)
+        return min(values) if values else None
+
+    def maximum(self, name, start=None, end=None):
+        values = self.values(name, start, end)
+        return max(values) if values else None
+
+    def mean(self, name, start=None, end=None):
+        values = self.values(name, start, end)
+        return math.fsum(values) / len(values) if values else None
+
+    def indexes_where(self, name, comparison, threshold, start=None, end=None):
+        """
+        Returns the row indexes where a numeric column compares to a threshold,
+        e.g. indexes_where("precipitation_probability", ">=", 50). Missing values never match.
+        """
+        compare = _COMPARISONS[comparison]
+        first, last = self.time_range(start, end)
+        column = getattr(self, name)
+        return [index for index in range(first, last) if compare(column[index], threshold)]
+
+    def row(self, index):
+        """Rebuilds the hourly forecast row of one index."""
+        return {
+            "forecast_period": self.forecast_period[index],
+            "start_time": format_iso(self.start_time[index], self.utc_offset[index]),
+            "temperature": _or_none(self.temperature[index]),
+            "temperature_unit": "F",
+            "precipitation_probability_value": _or_none(self.precipitation_probability[index], int),
+            "dewpoint_unit": "wmoUnit:degF",
+            "dewpoint_value": _or_none(self.dewpoint[index]),
+            "relative_humidity_value": _or_none(self.relative_humidity[index], int),
+            "wind_speed": self.text("wind_speed_text", index),
+            "wind_direction": self.text("wind_direction", index),
+            "weather_icon_url": self.text("weather_icon_url", index),
+            "short_forecast": self.text("short_forecast", index),
+        }
+
+    def forecast(self, index):
+        """Builds the HourlyForecast of one row; its display strings are only formatted when read."""
+        return HourlyForecast(
+            self.forecast_period[index], self.start_time[index], self.utc_offset[index],
+            self.temperature[index], self.dewpoint[index], self.relative_humidity[index],
+            self.precipitation_probability[index], self.text("wind_speed_text", index),
+            self.text("wind_direction", index), self.text("weather_icon_url", index),
+            self.text("short_forecast", index)
+        )
+
+    def _copy_buffers(self):
+        # Copies columns built by from_buffers() into arrays so rows can be added to them
+        for name, type_code in COLUMN_TYPES:
+            column = array(type_code)
+            column.frombytes(memoryview(getattr(self, name)).cast("B"))
+            setattr(self, name, column)
+        self._string_indexes = {value: index for index, value in enumerate(self._strings)}
+
+    def _intern_column(self, values):
+        # The string table indexes of a column of text, interning each distinct text once
+        indexes = {value: self._intern(value) for value in dict.fromkeys(values)}
+        return list(map(indexes.__getitem__, values))
+
+    def _intern(self, value):
+        value = value or ""
+        index = self._string_indexes.get(value)
+        if index is None:
+            index = len(self._strings)
+            self._strings.append(value)
+            self._string_indexes[value] = index
+        return index
+
+
+def _or_none(value, cast=float):
+    return None if math.isnan(value) else cast(value)
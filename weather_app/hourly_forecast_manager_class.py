@@ -1,6 +1,11 @@
 import csv
+import time
+from bisect import bisect_right
 from datetime import datetime
-from hourly_forecast_class import HourlyForecast
+import forecast_snapshot
+from forecast_store import ForecastStore
+from hourly_day_index import HourlyDayIndex
+from hourly_forecast_columns import HourlyForecastColumns
 
 """
 The hourly forecast manager class should load and store all houly forecast data from a csv file.
@@ -9,12 +14,19 @@ It should contain:
     - the name of the csv file
     - the time the forecast was generated at
     - a list of dictionaries containing the daily forecast for different periods
+
+The periods are kept in an HourlyForecastColumns store (one typed array per field) and the
+HourlyForecast objects, with their display strings, are only built when get_forecasts() is called.
+The day index (per-day summaries and the lookup of the hour at a time) is also built the first time it is
+asked for, and kept until rows are added.
 """
 #Create an Hourly Forecast Manager Class
 class HourlyForecastManager:
     def __init__(self, csv_file_name):
         self._csv_file_name = csv_file_name
-        self._forecasts = []
+        self._columns = HourlyForecastColumns()
+        self._forecasts = None
+        self._day_index = None
         self._forecast_generation_time = None
 
     # Create a method to read forecasts from the csv file and create hourly forecast objects from the data
@@ -27,43 +39,117 @@ class HourlyForecastManager:
                 header = reader.fieldnames
                 if not reader.fieldnames:
                     raise ValueError("CSV file is empty or has no headers.")
-                for row in reader:
-                    # check for missing values
-                    for key, value in row.items():
-                        if value == '':
-                            row[key] = None
-                    forecast_object = HourlyForecast.data_to_objects(row)  # Use the class method
-                    self._forecasts.append(forecast_object)
-
-                # Get forecast generation time from the first row, if available
-                if self._forecasts:
-                    first_forecast = self._forecasts[0]
-                    if first_forecast.start_time_raw:  # check if start_time_raw exists
-                        try:
-                            # parse the time.
-                            forecast_gen_time = datetime.fromisoformat(first_forecast.start_time_raw)
-                            self._forecast_generation_time = forecast_gen_time
-                        except ValueError:
-                            self._forecast_generation_time = None
-                    else:
-                        self._forecast_generation_time = None
-                else:
-                    self._forecast_generation_time = None
+                # the rows are parsed a whole column at a time; missing values ('' in the file) are handled there
+                self._columns.extend(reader)
+                self._forecasts = None
+                self._day_index = None
+
+                # The csv file doesn't hold the generation time (the start time of the first row is just the
+                # first hour forecast), but a file in the forecast store is named after it
+                if self._forecast_generation_time is None:
+                    self.set_forecast_generation_time(ForecastStore.generation_time(self._csv_file_name))
 
             return True
         except Exception as e:
             print(f"Error loading daily forecasts: {e}")
             return False
 
+    # Create a method that builds a manager straight from forecast rows (see forecast_rows.py)
+    # without reading a csv file
+    @classmethod
+    def from_rows(cls, rows, generation_time=None):
+        manager = cls(None)
+        manager.extend(rows)
+        manager.set_forecast_generation_time(generation_time)
+        return manager
+
+    # Create a method that loads a manager from a binary snapshot file (see forecast_snapshot.py)
+    # The file is memory-mapped and the columns are read straight from it, so nothing has to be parsed
+    # Raises OSError or ValueError if the file can't be read
+    @classmethod
+    def load_snapshot(cls, file_name):
+        columns, metadata = forecast_snapshot.load_snapshot(file_name)
+        manager = cls(file_name)
+        manager._columns = columns
+        manager.set_forecast_generation_time(metadata.get("generation_time"))
+        return manager
+
+    # Create a method that saves the forecasts to a binary snapshot file
+    # (the csv file stays the format for exporting the forecasts)
+    def save_snapshot(self, file_name):
+        with open(file_name, 'wb') as snapshot_file:
+            self.write_snapshot(snapshot_file)
+
+    def write_snapshot(self, snapshot_file):
+        generation_time = self._forecast_generation_time
+        metadata = {"generation_time": generation_time.isoformat() if generation_time else None}
+        forecast_snapshot.write_snapshot(snapshot_file, self._columns, metadata)
+
+    # Create a method that adds more forecast rows to the manager,
+    # e.g. each batch of periods decoded from a streamed forecast response
+    def extend(self, rows):
+        self._columns.extend(rows)
+        self._forecasts = None
+        self._day_index = None
+
+    # a setter for the generation time (an ISO string), for a manager filled with extend()
+    def set_forecast_generation_time(self, generation_time):
+        try:
+            self._forecast_generation_time = datetime.fromisoformat(generation_time)
+        except (TypeError, ValueError):
+            self._forecast_generation_time = None
+
     # write a getter for the forecasts
+    # the forecast objects are built from the columns the first time they are asked for
     def get_forecasts(self):
+        if self._forecasts is None:
+            self._forecasts = [self._columns.forecast(index) for index in range(len(self._columns))]
         return self._forecasts
 
+    # Create a method that returns the forecast of the hour containing an instant (epoch seconds or an aware
+    # datetime, now if not given), or None if the forecasts don't cover it
+    # The hour is found with a binary search of the start times (see HourlyDayIndex.hour_at())
+    def get_forecast_at(self, instant=None):
+        index = self.get_day_index().hour_at(time.time() if instant is None else instant)
+        if index is None:
+            return None
+        if self._forecasts is not None:
+            return self._forecasts[index]
+        return self._columns.forecast(index)
+
+    # Create a method that removes the hours that are over at an instant (now if not given),
+    # so forecasts loaded from an older file or cache start at the current hour; returns how many were removed
+    # The manager gets new columns, so columns taken from it before (e.g. by a background save) keep every hour
+    def trim_expired(self, instant=None):
+        instant = time.time() if instant is None else instant
+        if isinstance(instant, datetime):
+            instant = instant.timestamp()
+        # An hour is over once the next one starts, or an hour after its start for the last one
+        expired = bisect_right(self._columns.start_time, instant - 60 * 60)
+        expired = max(expired, self.get_day_index().hour_at(instant) or 0)
+        if expired:
+            self._columns = self._columns.without_first(expired)
+            if self._forecasts is not None:
+                self._forecasts = self._forecasts[expired:]
+            self._day_index = None
+        return expired
+
+    # a getter for the columnar store, for min/max/mean/threshold queries without building forecast objects
+    def get_columns(self):
+        return self._columns
+
+    # a getter for the day index (see hourly_day_index.py): the summary of each local date
+    # (min/max/mean temperature, max chance of rain, dominant condition) and the hour at a given time
+    def get_day_index(self):
+        if self._day_index is None:
+            self._day_index = HourlyDayIndex(self._columns)
+        return self._day_index
+
     def get_forecast_generation_time(self):
         return self._forecast_generation_time
 
     def __str__(self):
-        return f"HourlyForecastManager(csv_file_name='{self._csv_file_name}', num_forecasts={len(self._forecasts)}, generation_time={self._forecast_generation_time})"
+        return f"HourlyForecastManager(csv_file_name='{self._csv_file_name}', num_forecasts={len(self._columns)}, generation_time={self._forecast_generation_time})"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+import math
+from difflib import SequenceMatcher
+from PyQt5.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QFont, QPainter, QPalette
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+from icon_resolver import IconResolver
+
+# Extra item data roles of the hourly forecast model
+ForecastRole = Qt.UserRole + 1  # the HourlyForecast of an hour row, None for a day header
+IsHeaderRole = Qt.UserRole + 2  # True for a day header row
+ExpandedRole = Qt.UserRole + 3  # True if an hour row shows its details
+
+
+class HourlyForecastModel(QAbstractListModel):
+    """
+    A list model of hourly forecasts with a header row before the first hour of each day.
+
+    New forecasts are merged into the current rows by their key (the hour's start time, or the date of a header),
+    so a refresh only inserts, removes or repaints the rows that actually changed and a row keeps its
+    expanded state across refreshes.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Each item is a (key, signature, date or HourlyForecast) tuple
+        self._items = []
+        self._expanded = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._items):
+            return None
+        key, _, value = self._items[index.row()]
+        is_header = key[0] == "date"
+        if role == Qt.DisplayRole:
+            return value if is_header else value.forecast_hour
+        if role == ForecastRole:
+            return None if is_header else value
+        if role == IsHeaderRole:
+            return is_header
+        if role == ExpandedRole:
+            return key in self._expanded
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled if index.isValid() else Qt.NoItemFlags
+
+    def set_forecasts(self, forecasts, day_index=None):
+        """
+        Updates the rows in place to show a new list of hourly forecasts.
+        With the HourlyDayIndex of the forecasts, the days come from it and their headers show a summary of the day.
+        """
+        new_items = _items_for(forecasts, day_index)
+        old_keys = [item[0] for item in self._items]
+        new_keys = [item[0] for item in new_items]
+        opcodes = SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+
+        # Apply the changes from the bottom up so the row numbers of the changes above stay valid
+        for tag, old_start, old_end, new_start, new_end in reversed(opcodes):
+            if tag == "equal":
+                self._update_rows(old_start, new_items[new_start:new_end])
+                continue
+            if old_end > old_start:
+                self.beginRemoveRows(QModelIndex(), old_start, old_end - 1)
+                del self._items[old_start:old_end]
+                self.endRemoveRows()
+            if new_end > new_start:
+                self.beginInsertRows(QModelIndex(), old_start, old_start + new_end - new_start - 1)
+                self._items[old_start:old_start] = new_items[new_start:new_end]
+                self.endInsertRows()
+
+        self._expanded.intersection_update(new_keys)
+
+    def clear(self):
+        self.set_forecasts([])
+
+    def toggle_expanded(self, index):
+        """Shows or hides the details of an hour row."""
+        key = self._items[index.row()][0]
+        if key[0] == "date":
+            return
+        if key in self._expanded:
+            self._expanded.remove(key)
+        else:
+            self._expanded.add(key)
+        self.dataChanged.emit(index, index, [ExpandedRole])
+
+    def _update_rows(self, first, items):
+        # Replaces the rows whose content changed, repainting each run of changed rows once
+        run_start = None
+        for offset, item in enumerate(items + [None]):
+            row = first + offset
+            changed = item is not None and item[1] != self._items[row][1]
+            if changed:
+                self._items[row] = item
+                if run_start is None:
+                    run_start = row
+            elif run_start is not None:
+                self.dataChanged.emit(self.index(run_start), self.index(row - 1))
+                run_start = None
+
+
+class HourlyForecastDelegate(QStyledItemDelegate):
+    """Paints the rows of an HourlyForecastModel: day headers, and hour rows with a +/- button for the details."""
+
+    ROW_HEIGHT = 44
+    HEADER_HEIGHT = 40
+    DETAIL_LINE_HEIGHT = 28
+    MARGIN = 5
+    BUTTON_WIDTH = 30
+    # Widths of the hour, icon, chance of rain and temperature columns; the wind column takes the rest of the row
+    COLUMN_WIDTHS = (110, 45, 100, 70)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.uniform_font = QFont()
+        self.uniform_font.setPixelSize(20)
+
+        self.icon_font = QFont('Segoe UI Emoji')
+        self.icon_font.setPixelSize(20)
+
+    def sizeHint(self, option, index):
+        if index.data(IsHeaderRole):
+            return QSize(option.rect.width(), self.HEADER_HEIGHT)
+        height = self.ROW_HEIGHT
+        if index.data(ExpandedRole):
+            height += 3 * self.DETAIL_LINE_HEIGHT
+        return QSize(option.rect.width(), height)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect.adjusted(self.MARGIN, self.MARGIN // 2, -self.MARGIN, -(self.MARGIN - self.MARGIN // 2))
+        painter.setPen(option.palette.color(QPalette.Text))
+
+        if index.data(IsHeaderRole):
+            painter.setFont(self.uniform_font)
+            painter.drawText(rect.adjusted(self.MARGIN, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter, index.data())
+            painter.restore()
+            return
+
+        forecast = index.data(ForecastRole)
+        expanded = index.data(ExpandedRole)
+
+        # Row background
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(Qt.white)
+        painter.drawRoundedRect(rect, 4, 4)
+        painter.setPen(option.palette.color(QPalette.Text))
+
+        # Top row: hour, icon, chance of rain, temperature, wind and the +/- button
+        top = QRect(rect.left() + self.MARGIN, rect.top(), rect.width() - 2 * self.MARGIN,
+                    self.ROW_HEIGHT - self.MARGIN)
+        cells = ((forecast.forecast_hour, self.uniform_font), (forecast.weather_icon, self.icon_font),
+                 (forecast.chance_of_rain, self.uniform_font), (forecast.temperature_fahrenheit, self.uniform_font))
+        left = top.left()
+        for (text, font), width in zip(cells, self.COLUMN_WIDTHS):
+            painter.setFont(font)
+            painter.drawText(QRect(left, top.top(), width, top.height()), Qt.AlignLeft | Qt.AlignVCenter, text)
+            left += width
+
+        painter.setFont(self.uniform_font)
+        wind_rect = QRect(left, top.top(), max(0, top.right() - self.BUTTON_WIDTH - left), top.height())
+        wind = painter.fontMetrics().elidedText(forecast.wind, Qt.ElideRight, wind_rect.width())
+        painter.drawText(wind_rect, Qt.AlignLeft | Qt.AlignVCenter, wind)
+
+        button = QStyleOptionButton()
+        button.rect = self._button_rect(option.rect)
+        button.text = "-" if expanded else "+"
+        button.state = QStyle.State_Enabled
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+        # Details (only when expanded)
+        if expanded:
+            details = (f"Short Forecast: {forecast.short_forecast}", f"Dewpoint: {forecast.dewpoint_fahrenheit}",
+                       f"Relative Humidity: {forecast.relative_humidity}")
+            line = QRect(top.left(), top.bottom() + 1, top.width(), self.DETAIL_LINE_HEIGHT)
+            for text in details:
+                text = painter.fontMetrics().elidedText(text, Qt.ElideRight, line.width())
+                painter.drawText(line, Qt.AlignLeft | Qt.AlignVCenter, text)
+                line.translate(0, self.DETAIL_LINE_HEIGHT)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        """Toggles the details of an hour row when its +/- button is clicked."""
+        if (event.type() == QEvent.MouseButtonRelease and not index.data(IsHeaderRole)
+                and self._button_rect(option.rect).contains(event.pos())):
+            model.toggle_expanded(index)
+            self.sizeHintChanged.emit(index)
+            return True
+        return False
+
+    def _button_rect(self, row_rect):
+        top = row_rect.top() + self.MARGIN // 2 + self.MARGIN
+        height = self.ROW_HEIGHT - 3 * self.MARGIN
+        return QRect(row_rect.right() - 2 * self.MARGIN - self.BUTTON_WIDTH, top, self.BUTTON_WIDTH, height)
+
+
+def _items_for(forecasts, day_index=None):
+    # Builds the model items: a header before the first hour of each day, then that day's hours.
+    # With a day index the headers of its days also show their summary
+    days = {day.first: day for day in day_index.days} if day_index is not None else {}
+    items = []
+    forecast_date = None
+    for index, forecast in enumerate(forecasts):
+        day = days.get(index)
+        if day is not None or forecast.formatted_date != forecast_date:
+            forecast_date = forecast.formatted_date
+            header = _day_header(forecast_date, day) if day is not None else forecast_date
+            items.append((("date", forecast_date), header, header))
+        items.append(_hour_item(forecast))
+    return items
+
+
+def _hour_item(forecast):
+    key = ("hour", forecast.start_time if forecast.start_time is not None else forecast.forecast_period)
+    return key, _signature(forecast), forecast
+
+
+def _day_header(forecast_date, day):
+    # The header of a day: its date, then its low / high, dominant condition and highest chance of rain
+    parts = [forecast_date]
+    if day.min_temperature is not None:
+        parts.append(f"{day.min_temperature:.0f}° / {day.max_temperature:.0f}°F")
+    if day.condition is not None:
+        parts.append(IconResolver.shared().emoji_for_code(day.condition))
+    if day.max_precipitation_probability is not None:
+        parts.append(f"{day.max_precipitation_probability:.0f}%")
+    return "   ".join(parts)
+
+
+def _signature(forecast):
+    # The raw values an hour row shows. NaN is replaced by None, since NaN never compares equal to itself.
+    return tuple(None if isinstance(value, float) and math.isnan(value) else value for value in (
+        forecast.start_time, forecast.utc_offset, forecast.temperature, forecast.dewpoint, forecast.humidity,
+        forecast.precipitation_probability, forecast.wind_speed, forecast.wind_direction, forecast.icon_url,
+        forecast.short_forecast))
@@ -0,0 +1,247 @@
+import hashlib
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from atomic_file import load_json, save_json, temp_file, write_atomic
+
+
+class HttpCache:
+    """
+    An on-disk HTTP cache for GET requests to the weather API.
+
+    Each response body is stored next to its validators (ETag / Last-Modified) and the time it expires.
+    Fresh entries are returned without touching the network, stale entries are revalidated with
+    If-None-Match / If-Modified-Since so an unchanged resource only costs a 304 reply.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir="http_cache"):
+        self._cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide cache used by AsyncForecastClient."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def cached_body(self, url):
+        """
+        The first step of a cached fetch.
+        Returns a tuple of (entry, body): body is the cached bytes if the entry is still fresh (a hit),
+        otherwise None and the entry's validators should be sent with conditional_headers().
+        """
+        entry = self.lookup(url)
+        if entry is not None and entry["expires"] > time.time():
+            body = self._read_body(url)
+            if body is not None:
+                self._count("hits")
+                return entry, body
+        return entry, None
+
+    def not_modified(self, url, headers):
+        """Handles a 304 reply: returns the cached body, or None if it has to be downloaded again."""
+        body = self.refresh(url, headers)
+        if body is not None:
+            self._count("revalidations")
+        return body
+
+    def downloaded(self, url, headers, body):
+        """Handles a full 200 reply by storing it."""
+        self._count("misses")
+        self.store(url, headers, body)
+
+    def cached_chunks(self, url, chunk_size=65536):
+        """
+        Streaming version of cached_body(): returns a tuple of (entry, chunks), where chunks is an iterator over
+        the cached body in chunk_size pieces if the entry is still fresh (a hit), otherwise None.
+        """
+        entry = self.lookup(url)
+        if entry is not None and entry["expires"] > time.time():
+            chunks = self._body_chunks(url, chunk_size)
+            if chunks is not None:
+                self._count("hits")
+                return entry, chunks
+        return entry, None
+
+    def not_modified_chunks(self, url, headers, chunk_size=65536):
+        """Streaming version of not_modified(): returns an iterator over the cached body, or None."""
+        chunks = self._body_chunks(url, chunk_size)
+        if chunks is not None:
+            self._write_meta(url, headers, self.lookup(url))
+            self._count("revalidations")
+        return chunks
+
+    def body_writer(self, url, headers):
+        """
+        Streaming version of downloaded(): returns a BodyWriter the body is written to chunk by chunk.
+        Use it in a with statement; the entry is only stored if the block completes.
+        """
+        self._count("misses")
+        return BodyWriter(self, url, headers)
+
+    def lookup(self, url):
+        """Returns the stored metadata for url (validators and expiry time), or None if it isn't cached."""
+        return load_json(self._meta_path(url))
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Builds the If-None-Match / If-Modified-Since headers to revalidate a cached entry."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, headers, body):
+        """Saves a full response body together with its validators and expiry time."""
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        os.makedirs(self._cache_dir, exist_ok=True)
+        write_atomic(self._body_path(url), body)
+        self._write_meta(url, headers)
+
+    def refresh(self, url, headers):
+        """
+        Updates the expiry time of a cached entry after a 304 Not Modified reply.
+        Returns the cached body, or None if it is no longer on disk.
+        """
+        body = self._read_body(url)
+        if body is not None:
+            self._write_meta(url, headers, self.lookup(url))
+        return body
+
+    def invalidate(self, url):
+        """Removes a cached entry so the next fetch downloads it again."""
+        for path in (self._meta_path(url), self._body_path(url)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        """Returns the hit / miss / revalidation counters."""
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "revalidations": self._revalidations}
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._revalidations = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, f"_{counter}", getattr(self, f"_{counter}") + 1)
+
+    def _write_meta(self, url, headers, previous=None):
+        # A 304 reply may leave out validators, so keep the ones we already had
+        previous = previous or {}
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag", previous.get("etag")),
+            "last_modified": headers.get("Last-Modified", previous.get("last_modified")),
+            "expires": self._expiry_time(headers),
+        }
+        save_json(self._meta_path(url), meta)
+
+    @staticmethod
+    def _expiry_time(headers):
+        """Works out when a response goes stale from Cache-Control max-age, falling back to Expires."""
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-cache" in cache_control:
+            return 0
+        for directive in cache_control.split(","):
+            name, _, value = directive.strip().partition("=")
+            if name == "max-age":
+                try:
+                    age = int(headers.get("Age", 0))
+                    return time.time() + int(value) - age
+                except ValueError:
+                    return 0
+        if headers.get("Expires"):
+            try:
+                return parsedate_to_datetime(headers["Expires"]).timestamp()
+            except (TypeError, ValueError):
+                return 0
+        return 0
+
+    def _body_chunks(self, url, chunk_size):
+        # Opens the body file up front, so a missing body is noticed before anything is read from it
+        try:
+            body_file = open(self._body_path(url), "rb")
+        except OSError:
+            return None
+
+        def chunks():
+            with body_file:
+                while True:
+                    chunk = body_file.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        return chunks()
+
+    def _read_body(self, url):
+        try:
+            with open(self._body_path(url), "rb") as body_file:
+                return body_file.read()
+        except OSError:
+            return None
+
+    def _key(self, url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, url):
+        return os.path.join(self._cache_dir, f"{self._key(url)}.json")
+
+    def _body_path(self, url):
+        return os.path.join(self._cache_dir, f"{self._key(url)}.body")
+
+
+class BodyWriter:
+    """
+    Writes a response body into the cache as it is downloaded (see HttpCache.body_writer()).
+    The body goes to a temporary file that only replaces the cached entry when the download completed.
+    """
+
+    def __init__(self, cache, url, headers):
+        self._cache = cache
+        self._url = url
+        self._headers = headers
+        self._file = None
+        if "no-store" not in headers.get("Cache-Control", "").lower():
+            os.makedirs(cache._cache_dir, exist_ok=True)
+            self._file, self._temp_path = temp_file(cache._body_path(url))
+
+    def write(self, chunk):
+        if self._file is not None:
+            self._file.write(chunk)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self._file is None:
+            return
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._temp_path, self._cache._body_path(self._url))
+            self._cache._write_meta(self._url, self._headers)
+        else:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
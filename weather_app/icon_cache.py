@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from PyQt5.QtCore import QObject, QUrl, pyqtSignal
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
+from atomic_file import write_atomic
+
+
+class IconCache(QObject):
+    """
+    A process wide cache of weather icon images.
+
+    Decoded pixmaps are kept in a small in-memory LRU, on top of a persistent on-disk store of the
+    downloaded bytes. Only an icon that is in neither is downloaded, and several requests for the
+    same URL while it is downloading share that one download.
+    """
+
+    # Emitted with the URL and its pixmap once an icon that wasn't in memory has been loaded
+    iconReady = pyqtSignal(str, QPixmap)
+    # Emitted with the URL when an icon couldn't be downloaded
+    iconFailed = pyqtSignal(str)
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir="icon_cache", max_pixmaps=64, parent=None):
+        super().__init__(parent)
+        self._cache_dir = cache_dir
+        self._max_pixmaps = max_pixmaps
+        self._pixmaps = OrderedDict()
+        self._pending = set()
+
+        self._manager = QNetworkAccessManager(self)
+        self._manager.finished.connect(self._on_reply)
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide icon cache. Must be called from the GUI thread."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def request(self, url):
+        """
+        Returns the pixmap of an icon right away if it is in memory or on disk.
+        Otherwise returns None and starts a download; iconReady or iconFailed is emitted when it is done.
+        """
+        pixmap = self._pixmaps.get(url)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(url)
+            return pixmap
+
+        data = self._read(url)
+        if data is not None:
+            pixmap = self._remember(url, data)
+            if pixmap is not None:
+                return pixmap
+
+        if url not in self._pending:
+            self._pending.add(url)
+            request = QNetworkRequest(QUrl(url))
+            # Remember the URL as given, since the reply's URL may be normalized
+            request.setAttribute(QNetworkRequest.User, url)
+            self._manager.get(request)
+        return None
+
+    def _on_reply(self, reply):
+        """Handles the completion of an icon download."""
+        url = reply.request().attribute(QNetworkRequest.User)
+        self._pending.discard(url)
+        pixmap = None
+        if not reply.error():
+            data = bytes(reply.readAll())
+            pixmap = self._remember(url, data)
+            if pixmap is not None:
+                self._write(url, data)
+        reply.deleteLater()
+
+        if pixmap is None:
+            self.iconFailed.emit(url)
+        else:
+            self.iconReady.emit(url, pixmap)
+
+    def _remember(self, url, data):
+        # Decode the bytes and keep the pixmap, dropping the least recently used one if the cache is full
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data):
+            return None
+        self._pixmaps[url] = pixmap
+        self._pixmaps.move_to_end(url)
+        while len(self._pixmaps) > self._max_pixmaps:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def _path(self, url):
+        return os.path.join(self._cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _read(self, url):
+        try:
+            with open(self._path(url), "rb") as icon_file:
+                return icon_file.read()
+        except OSError:
+            return None
+
+    def _write(self, url, data):
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            write_atomic(self._path(url), data)
+        except OSError as e:
+            print(f"Icon cache save failed: {e}")
@@ -0,0 +1,127 @@
+import threading
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# One condition of an icon, e.g. "tsra_hi,60" -> IconCondition("tsra_hi", 60). probability is None if not given.
+IconCondition = namedtuple("IconCondition", ["code", "probability"])
+
+# A parsed icon URL: "day" or "night" plus its conditions in order. An icon can show two conditions,
+# e.g. .../land/day/tsra_hi,20/tsra_hi,60?size=medium
+WeatherIcon = namedtuple("WeatherIcon", ["time_of_day", "conditions"])
+
+# Icon codes -> emojis. Covers the current api.weather.gov icon set and the older codes it replaced.
+EMOJI_BY_CODE = {
+    "skc": "☀️",  # clear sky
+    "few": "🌤️",  # few clouds
+    "sct": "⛅",  # scattered clouds
+    "bkn": "☁️",  # broken clouds
+    "ovc": "☁️",  # overcast
+    "wind_skc": "🌬️",  # clear with wind
+    "wind_few": "🌬️",  # few clouds with wind
+    "wind_sct": "🌬️",  # scattered clouds with wind
+    "wind_bkn": "🌬️",  # broken clouds with wind
+    "wind_ovc": "🌬️",  # overcast with wind
+    "snow": "❄️",  # snow
+    "sn": "❄️",
+    "rain_snow": "🌨️",  # rain and snow mix
+    "ra_sn": "🌨️",
+    "rain_sleet": "🌧️",  # rain with ice pellets
+    "raip": "🌧️",
+    "snow_sleet": "🌨️",  # snow and ice pellets
+    "snip": "❄️",
+    "fzra": "🌧️",  # freezing rain
+    "rain_fzra": "🌧️",  # rain/freezing rain mix
+    "ra_fzra": "🌧️",
+    "snow_fzra": "🌨️",  # freezing rain and snow
+    "fzra_sn": "🌨️",
+    "sleet": "🧊",  # ice pellets
+    "ip": "🧊",
+    "rain": "🌧️",  # rain
+    "ra": "🌧️",
+    "minus_ra": "🌦️",  # light rain
+    "rain_showers": "🌧️",  # showers
+    "shra": "🌧️",
+    "rain_showers_hi": "🌦️",  # showers, some sun
+    "hi_shwrs": "🌧️",
+    "tsra": "⛈️",  # thunderstorms
+    "tsra_sct": "⛈️",  # scattered thunderstorms
+    "scttsra": "⛈️",
+    "tsra_hi": "⛈️",  # isolated thunderstorms
+    "hi_tsra": "⛈️",
+    "ts_warn": "⛈️",  # thunderstorm warning
+    "ts_watch": "⛈️",  # thunderstorm watch
+    "ts_nowarn": "⛈️",  # thunderstorm, no warning
+    "tornado": "🌪️",  # tornado
+    "tor": "🌪️",
+    "fc": "🌪️",  # funnel cloud
+    "hurricane": "🌀",  # hurricane
+    "tropical_storm": "🌀",  # tropical storm
+    "hur_warn": "🌀",  # hurricane warning
+    "hur_watch": "🌀",  # hurricane watch
+    "dust": "🌫️",  # dust
+    "du": "🌫️",
+    "smoke": "🌫️",  # smoke
+    "fu": "🌫️",
+    "haze": "🌫️",  # haze
+    "hz": "🌫️",
+    "hot": "🥵",  # hot
+    "cold": "🥶",  # cold
+    "blizzard": "🌨️",  # blizzard
+    "fog": "🌫️",  # fog
+    "fg": "🌫️",
+}
+
+
+class IconResolver:
+    """
+    Turns api.weather.gov icon URLs into structured condition codes and emojis.
+
+    Lookups are exact matches in a prebuilt table, and results are kept in an LRU cache keyed on the URL,
+    so the handful of distinct icon URLs in a forecast are each only parsed once.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, emoji_by_code=None, cache_size=1024):
+        self._emoji_by_code = dict(emoji_by_code or EMOJI_BY_CODE)
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+        self.emoji = lru_cache(maxsize=cache_size)(self._emoji)
+
+    @classmethod
+    def shared(cls):
+        """Returns the process wide resolver used by get_emoji()."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def _parse(url):
+        """Parses an icon URL into a WeatherIcon, or returns None if it isn't one."""
+        if not url:
+            return None
+        parts = urlsplit(url).path.lower().split("/")
+        # The path looks like /icons/<set>/<day|night>/<condition>[/<condition>]
+        for index, part in enumerate(parts):
+            if part in ("day", "night"):
+                conditions = tuple(_parse_condition(segment) for segment in parts[index + 1:] if segment)
+                return WeatherIcon(part, conditions) if conditions else None
+        # Fall back to the last path segment for URLs without a day/night part
+        return WeatherIcon(None, (_parse_condition(parts[-1]),)) if parts[-1] else None
+
+    def _emoji(self, url):
+        """Returns the emoji of the first condition in an icon URL: "" without a URL, "?" for an unknown code."""
+        icon = self.parse(url)
+        if icon is None:
+            return "" if not url else "?"
+        return self._emoji_by_code.get(icon.conditions[0].code, "?")
+
+    def emoji_for_code(self, code):
+        return self._emoji_by_code.get(code, "?")
+
+
+def _parse_condition(segment):
+    code, _, probability = segment.partition(",")
+    return IconCondition(code, int(probability) if probability.isdigit() else None)
@@ -0,0 +1,116 @@
+"""
+Fast handling of the ISO 8601 times of api.weather.gov forecasts.
+
+The API writes every time in the same shape, YYYY-MM-DDTHH:MM:SS+HH:MM, and a forecast only uses a couple of
+UTC offsets and a handful of dates and hours. parse_iso() reads that shape by slicing instead of building
+a datetime, looking the date and hour and the offset up in small caches; anything else falls back to
+datetime.fromisoformat().
+The display labels of a start time only depend on its local date or its local time of day, so they are
+memoized by those and strftime runs once per distinct day and hour.
+"""
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_DAY = 24 * 60 * 60
+
+
+@lru_cache(maxsize=65536)
+def parse_iso(text):
+    """
+    Returns (epoch seconds, UTC offset in seconds) of an ISO time, or None if it is missing or invalid.
+    A time without an offset is taken as local time, and gets this computer's UTC offset at that time.
+    The same times come up again and again (in every issuance that covers them), so results are cached too.
+    """
+    if not text:
+        return None
+    if len(text) == 25 and text[13] == ":" and text[16] == ":" and text[19] in "+-" and text[22] == ":":
+        minutes, seconds = text[14:16], text[17:19]
+        try:
+            if (minutes + seconds).isdigit() and int(minutes) < 60 and int(seconds) < 60:
+                offset = _offset_seconds(text[19:])
+                return _hour_start(text[:13]) + int(minutes) * 60 + int(seconds) - offset, offset
+        except ValueError:
+            pass
+    return _parse_slow(text)
+
+
+def to_epoch(text):
+    """Returns the epoch seconds of an ISO time, or None if it is missing or invalid."""
+    parsed = parse_iso(text)
+    return None if parsed is None else parsed[0]
+
+
+@lru_cache(maxsize=None)
+def tzinfo_for(utc_offset):
+    """Returns the (shared) tzinfo of a UTC offset in seconds."""
+    return timezone(timedelta(seconds=utc_offset))
+
+
+def to_datetime(epoch, utc_offset):
+    """Returns the aware datetime of an epoch time in a UTC offset."""
+    return datetime.fromtimestamp(epoch, tzinfo_for(utc_offset))
+
+
+def format_iso(epoch, utc_offset):
+    """Returns the ISO time of an epoch time in a UTC offset, in the shape the API writes it."""
+    return to_datetime(epoch, utc_offset).isoformat()
+
+
+def date_label(epoch, utc_offset):
+    """Returns the local date of an epoch time as e.g. "Wednesday, Feb 26"."""
+    return _date_label((epoch + utc_offset) // _DAY)
+
+
+def hour_label(epoch, utc_offset):
+    """Returns the local time of day of an epoch time as e.g. "03:00 PM"."""
+    return _hour_label((epoch + utc_offset) % _DAY // 60)
+
+
+def local_offset(epoch):
+    """Returns the UTC offset in seconds of this computer's time zone at an epoch time."""
+    return time.localtime(epoch).tm_gmtoff
+
+
+@lru_cache(maxsize=4096)
+def _hour_start(date_hour):
+    # The epoch seconds (as UTC) of a YYYY-MM-DDTHH prefix; raises ValueError if it isn't one
+    hour = date_hour[11:13]
+    if (len(date_hour) != 13 or date_hour[4] != "-" or date_hour[7] != "-" or date_hour[10] != "T"
+            or not hour.isdigit() or int(hour) >= 24):
+        raise ValueError(date_hour)
+    return (date.fromisoformat(date_hour[:10]).toordinal() - _EPOCH_ORDINAL) * _DAY + int(hour) * 3600
+
+
+@lru_cache(maxsize=256)
+def _offset_seconds(offset_text):
+    # The seconds of a +HH:MM offset; raises ValueError if it isn't one
+    hours, minutes = offset_text[1:3], offset_text[4:6]
+    if len(offset_text) != 6 or not (hours + minutes).isdigit() or int(minutes) >= 60:
+        raise ValueError(offset_text)
+    seconds = int(hours) * 3600 + int(minutes) * 60
+    return -seconds if offset_text[0] == "-" else seconds
+
+
+def _parse_slow(text):
+    try:
+        date_time = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    epoch = int(date_time.timestamp())
+    if date_time.tzinfo is None:
+        # A naive time is local time, so it is shown as it was written
+        return epoch, local_offset(epoch)
+    return epoch, int(date_time.utcoffset().total_seconds())
+
+
+@lru_cache(maxsize=4096)
+def _date_label(local_day):
+    return date.fromordinal(local_day + _EPOCH_ORDINAL).strftime("%A, %b %d")
+
+
+@lru_cache(maxsize=None)
+def _hour_label(local_minute):
+    hour, minute = divmod(local_minute, 60)
+    return datetime(1970, 1, 1, hour, minute).strftime("%I:%M %p")
@@ -1,5 +1,6 @@
 import sys
 from PyQt5.QtWidgets import QApplication
+from forecast_client import ForecastClientLoop
 from ui import WeatherMainWindow
 
 if __name__ == "__main__":
@@ -7,4 +8,7 @@ if __name__ == "__main__":
     window = WeatherMainWindow()
     window.setWindowTitle("Weather App")
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    # Close the connections to the API that are kept open between refreshes
+    ForecastClientLoop.close_shared()
+    sys.exit(exit_code)
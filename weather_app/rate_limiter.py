@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    A thread safe token bucket.
+
+    Tokens are added at `rate` per second up to `burst`; acquire() takes one token,
+    waiting until one is available. Coroutines wait for one with acquire_async() instead, which doesn't
+    block the event loop; both can share the same bucket.
+    """
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        wait = self._take()
+        while wait:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self):
+        """Waits until a token is available and takes it."""
+        wait = self._take()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+    def _take(self):
+        # Takes a token and returns 0, or returns how long to wait before one is available
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self._rate
@@ -0,0 +1,119 @@
+import random
+import statistics
+import threading
+import time
+from iso_time import to_epoch
+
+# Until a location's cadence has been seen, assume the forecast is updated every hour
+DEFAULT_CADENCE_SECONDS = 60 * 60
+
+
+class RefreshScheduler:
+    """
+    Decides when to refresh the forecasts of each location next.
+
+    It keeps the generatedAt times of each location's forecasts ("daily", "hourly", ...) and learns how often
+    each is issued (the median of the last few intervals). The next poll is planned a little after the next
+    issuance is expected, plus some random jitter so many clients don't poll at the same moment:
+
+    - if a poll finds no new issuance yet, polls are retried with an exponential backoff;
+    - if a poll fails, it is retried with an exponential backoff too;
+    - a location that hasn't been refreshed yet is polled after the default cadence.
+    """
+
+    def __init__(self, default_cadence=DEFAULT_CADENCE_SECONDS, min_cadence=15 * 60, max_cadence=12 * 60 * 60,
+                 settle_delay=2 * 60, jitter=60, retry_backoff=5 * 60, error_backoff=60, max_backoff=30 * 60,
+                 history=8, random_source=random.random):
+        self._default_cadence = default_cadence
+        self._min_cadence = min_cadence
+        self._max_cadence = max_cadence
+        self._settle_delay = settle_delay
+        self._jitter = jitter
+        self._retry_backoff = retry_backoff
+        self._error_backoff = error_backoff
+        self._max_backoff = max_backoff
+        self._history = history
+        self._random = random_source
+        self._lock = threading.Lock()
+        # location -> {"issuances": {kind: {"last": epoch, "intervals": [...]}}, "misses": n, "failures": n}
+        self._locations = {}
+
+    def record_result(self, location, generated_times, now=None):
+        """
+        Records a successful refresh of a location. generated_times maps each kind of forecast to its
+        generatedAt (ISO time), e.g. {"daily": "...", "hourly": "..."}.
+        Returns True if any of them is a new issuance.
+        """
+        new_issuance = False
+        with self._lock:
+            state = self._state(location)
+            for kind, generated_time in generated_times.items():
+                generated = to_epoch(generated_time)
+                if generated is None:
+                    continue
+                issuance = state["issuances"].setdefault(kind, {"last": None, "intervals": []})
+                if issuance["last"] is not None and generated <= issuance["last"]:
+                    continue
+                if issuance["last"] is not None:
+                    issuance["intervals"] = (issuance["intervals"] + [generated - issuance["last"]])[-self._history:]
+                issuance["last"] = generated
+                new_issuance = True
+            state["failures"] = 0
+            state["misses"] = 0 if new_issuance else state["misses"] + 1
+        return new_issuance
+
+    def record_failure(self, location):
+        """Records a failed refresh of a location."""
+        with self._lock:
+            self._state(location)["failures"] += 1
+
+    def forget(self, location):
+        with self._lock:
+            self._locations.pop(location, None)
+
+    def cadence(self, location, kind):
+        """Returns how often (in seconds) a kind of forecast of a location seems to be issued."""
+        with self._lock:
+            issuance = self._state(location)["issuances"].get(kind)
+            return self._cadence(issuance)
+
+    def next_poll(self, location, now=None):
+        """Returns when (epoch seconds) the forecasts of a location should be refreshed next."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state(location)
+            if state["failures"]:
+                return now + self._backoff(self._error_backoff, state["failures"])
+
+            expected = [issuance["last"] + self._cadence(issuance)
+                        for issuance in state["issuances"].values() if issuance["last"] is not None]
+            if not expected:
+                return now + self._default_cadence + self._random() * self._jitter
+
+            poll = min(expected) + self._settle_delay
+            if poll > now:
+                return poll + self._random() * self._jitter
+            # The next issuance is overdue: poll soon, backing off while it still doesn't show up
+            if not state["misses"]:
+                return now + self._random() * self._jitter
+            return now + self._backoff(self._retry_backoff, state["misses"])
+
+    def seconds_until_next_poll(self, location, now=None):
+        now = time.time() if now is None else now
+        return max(0.0, self.next_poll(location, now) - now)
+
+    def _state(self, location):
+        state = self._locations.get(location)
+        if state is None:
+            state = self._locations[location] = {"issuances": {}, "misses": 0, "failures": 0}
+        return state
+
+    def _cadence(self, issuance):
+        if not issuance or not issuance["intervals"]:
+            return self._default_cadence
+        return min(self._max_cadence, max(self._min_cadence, statistics.median(issuance["intervals"])))
+
+    def _backoff(self, base, attempts):
+        # Exponential backoff with "equal jitter": between half and all of the delay
+        delay = min(self._max_backoff, base * 2 ** (attempts - 1))
+        return delay / 2 + self._random() * delay / 2
@@ -1,13 +1,16 @@
-import os
-from PyQt5.QtCore import Qt, pyqtSignal, QUrl
-from PyQt5.QtGui import QFont, QPixmap
-from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
+import time
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QFrame, QSizePolicy, QLabel, QHBoxLayout, QWidget, QVBoxLayout, QScrollArea, QTextEdit, \
-    QPushButton, QTabWidget, QLineEdit, QMessageBox
-#from daily_forecast_manager_class import DailyForecastManager
-from hourly_forecast_manager_class import HourlyForecastManager
+    QPushButton, QTabWidget, QLineEdit, QMessageBox, QListView
 from forecast_worker import ForecastWorker
+from geocode_worker import GeocodeWorker
 from geolocator import GeolocatorService
+from hourly_forecast_view import HourlyForecastDelegate, HourlyForecastModel
+from icon_cache import IconCache
+from refresh_scheduler import RefreshScheduler
+
+_HOUR = 60 * 60
 
 
 class CurrentWeatherWidget(QFrame):
@@ -83,6 +86,13 @@ class DailyForecastTab(QWidget):
         # Set the scroll content widget to the scroll area
         self.scroll_area.setWidget(self.scroll_content)
 
+        # The cards are kept between updates, keyed by the start time of their period (see _forecast_key)
+        # The stretch stays after the last card to fill the remaining space
+        self.cards = {}
+        self.scroll_layout.addStretch()
+        # The key of the period shown in the detailed forecast area
+        self.detailed_key = None
+
         # Create and configure the middle section (detailed forecast display area)
         self.detailed_forecast_label = QTextEdit()
         self.detailed_forecast_label.setReadOnly(True)
@@ -103,39 +113,67 @@ class DailyForecastTab(QWidget):
     def update_data(self, daily_forecast_generated_time, daily_forecasts):
         """
         Loads and updates the daily forecast data.
-        This will update the scroll area with new forecast cards and show the detailed forecast for the first item.
+        The new forecasts are matched to the existing cards by the start time of their period: a matching card is
+        reused and only its changed labels are updated, new periods get a new card and the cards of periods that
+        are gone are removed. The detailed forecast keeps showing the same period if it is still there, and
+        otherwise shows the first one.
         """
-        # Clear existing forecast cards in the scroll area
-        self._clear_forecast_cards()
-
-        # Add new forecast cards to the scroll layout
-        for forecast in daily_forecasts:
-            card = DailyForecastCard()
+        old_cards = self.cards
+        self.cards = {}
+
+        for position, forecast in enumerate(daily_forecasts):
+            key = _forecast_key(forecast)
+            card = old_cards.pop(key, None)
+            if card is None:
+                card = DailyForecastCard()
+                # Connect signal to show detailed forecast
+                card.showMoreClicked.connect(self._on_show_more_clicked)
+                card.setFixedWidth(150)
             card.update_data(forecast)
-            # Connect signal to show detailed forecast
-            card.showMoreClicked.connect(self.update_detailed_forecast_label)
-            card.setFixedWidth(150)
-            self.scroll_layout.addWidget(card)
+            self.cards[key] = card
+
+            # Move the card into place if it isn't there already
+            if self.scroll_layout.indexOf(card) != position:
+                self.scroll_layout.removeWidget(card)
+                self.scroll_layout.insertWidget(position, card)
 
-        self.scroll_layout.addStretch()  # Stretch the layout to fill remaining space
+        # Remove the cards of periods that are no longer in the forecast
+        for card in old_cards.values():
+            self.scroll_layout.removeWidget(card)
+            card.deleteLater()
 
-        # Display the detailed forecast of the first forecast card
-        self.update_detailed_forecast_label(daily_forecasts[0].period_name, daily_forecasts[0].detailed_forecast)
+        # Display the detailed forecast of the same period as before, or else of the first forecast card
+        if daily_forecasts:
+            shown = next((forecast for forecast in daily_forecasts if _forecast_key(forecast) == self.detailed_key),
+                         daily_forecasts[0])
+            self.detailed_key = _forecast_key(shown)
+            self.update_detailed_forecast_label(shown.period_name, shown.detailed_forecast)
 
         # Update the generated time label
+        self.update_generated_time(daily_forecast_generated_time)
+
+    def update_generated_time(self, daily_forecast_generated_time):
+        """Updates the generated time label, e.g. for a new issuance of the same forecast."""
         self.daily_generated_time.setPlainText(f"Daily forecast generated at {daily_forecast_generated_time}")
 
     def _clear_forecast_cards(self):
         """Clears all the forecast cards currently in the scroll layout."""
-        while self.scroll_layout.count():
-            child = self.scroll_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        for card in self.cards.values():
+            self.scroll_layout.removeWidget(card)
+            card.deleteLater()
+        self.cards = {}
+        self.detailed_key = None
+
+    def _on_show_more_clicked(self, period_name, detailed_forecast):
+        # Remember which period is shown, so it stays shown after a refresh
+        self.detailed_key = self.sender().forecast_key
+        self.update_detailed_forecast_label(period_name, detailed_forecast)
 
     def update_detailed_forecast_label(self, period_name, detailed_forecast):
         """Updates the detailed forecast text area with the provided period name and detailed forecast."""
         text = f"{period_name}: {detailed_forecast}"
-        self.detailed_forecast_label.setPlainText(text)
+        if self.detailed_forecast_label.toPlainText() != text:
+            self.detailed_forecast_label.setPlainText(text)
 
     def clear_data(self):
         """Clears the forecast cards, detailed forecast, and generated time."""
@@ -196,38 +234,55 @@ class DailyForecastCard(QFrame):
 
         self.setLayout(self.layout)
 
-        # Set up the network manager for fetching weather icon images
-        self.manager = QNetworkAccessManager(self)
-        self.manager.finished.connect(self.on_image_loaded)
+        # Weather icon images come from the shared icon cache, which only downloads an icon it doesn't have
+        self.icon_cache = IconCache.shared()
+        self.icon_cache.iconReady.connect(self.on_image_loaded)
+        self.icon_cache.iconFailed.connect(self.on_image_failed)
 
-        # Initialize period_name and detailed_forecast to None (to prevent crashes before it's set)
+        # Initialize period_name, detailed_forecast, icon_url and forecast_key to None
+        # (to prevent crashes before it's set)
         self.period_name = None
         self.detailed_forecast = None
+        self.icon_url = None
+        self.forecast_key = None
 
     def update_data(self, forecast):
-        """Populate the card with forecast data and trigger the image fetch."""
-        self.period_label.setText(forecast.period_name)
-        self.temp_label.setText(forecast.temperature_fahrenheit)
-        self.rain_label.setText(forecast.chance_of_rain)
-        self.icon_label.setText(f"Icon: {forecast.icon_url}")
+        """
+        Populate the card with forecast data and trigger the image fetch.
+        When the card is updated again, only the labels whose text changed are set, and the icon is only
+        requested again if its URL changed.
+        """
+        _set_text(self.period_label, forecast.period_name)
+        _set_text(self.temp_label, forecast.temperature_fahrenheit)
+        _set_text(self.rain_label, forecast.chance_of_rain)
         self.period_name = forecast.period_name
         self.detailed_forecast = forecast.detailed_forecast
+        self.forecast_key = _forecast_key(forecast)
 
-        # Request the weather icon image using the URL from forecast data
-        request = QNetworkRequest(QUrl(forecast.icon_url))
-        self.manager.get(request)
+        if forecast.icon_url == self.icon_url:
+            return
 
-    def on_image_loaded(self, reply):
-        """Handles the completion of the image fetch and sets it on the icon label."""
-        if reply.error():
+        # Request the weather icon image using the URL from forecast data
+        # If the cache already has it, it is shown right away; otherwise on_image_loaded shows it later
+        self.icon_label.setText(f"Icon: {forecast.icon_url}")
+        self.icon_url = forecast.icon_url
+        pixmap = self.icon_cache.request(forecast.icon_url)
+        if pixmap is not None:
+            self._show_image(pixmap)
+
+    def on_image_loaded(self, url, pixmap):
+        """Sets the icon on the icon label once the cache has loaded it (if it is this card's icon)."""
+        if url == self.icon_url:
+            self._show_image(pixmap)
+
+    def on_image_failed(self, url):
+        if url == self.icon_url:
             self.icon_label.setText("Failed to load image")
-        else:
-            data = reply.readAll()
-            pixmap = QPixmap()
-            pixmap.loadFromData(data)
-            self.icon_label.setPixmap(pixmap.scaled(100, 100, Qt.KeepAspectRatio))
+            # Forget the URL so the next update requests the icon again
+            self.icon_url = None
 
-        reply.deleteLater()
+    def _show_image(self, pixmap):
+        self.icon_label.setPixmap(pixmap.scaled(100, 100, Qt.KeepAspectRatio))
 
     def on_show_more_clicked(self):
         """Emits a signal with period name and detailed forecast when the button is clicked."""
@@ -272,10 +327,20 @@ class ForecastTabsWidget(QTabWidget):
         self.addTab(self.daily_tab, "Daily")
         self.addTab(self.hourly_tab, "Hourly")
 
-    def update_data(self, daily_generated_time, hourly_generated_time, daily_forecasts, hourly_forecasts):
+    def update_data(self, daily_generated_time, hourly_generated_time, daily_forecasts, hourly_forecasts,
+                    hourly_day_index=None):
         """Updates both the Daily and Hourly forecast tabs with new forecast data."""
         self.daily_tab.update_data(daily_generated_time, daily_forecasts)
-        self.hourly_tab.update_data(hourly_generated_time, hourly_forecasts)
+        self.hourly_tab.update_data(hourly_generated_time, hourly_forecasts, hourly_day_index)
+
+    def update_hourly_forecasts(self, hourly_forecasts, hourly_day_index=None):
+        """Updates only the rows of the Hourly tab, e.g. once the first hour is over."""
+        self.hourly_tab.update_forecasts(hourly_forecasts, hourly_day_index)
+
+    def update_generated_times(self, daily_generated_time, hourly_generated_time):
+        """Updates only the generated times of both tabs, when the forecasts themselves didn't change."""
+        self.daily_tab.update_generated_time(daily_generated_time)
+        self.hourly_tab.update_generated_time(hourly_generated_time)
 
     def clear_data(self):
         """Clears all forecast data from both tabs."""
@@ -295,19 +360,15 @@ class HourlyForecastTab(QWidget):
         self.hourly_layout.setContentsMargins(0, 0, 0, 0)
         self.hourly_layout.setSpacing(5)
 
-        # Create and configure the top section (scroll area for hourly forecast rows)
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-
-        # Create a container widget for the scroll area with a vertical layout
-        self.scroll_content = QWidget()
-        self.scroll_layout = QVBoxLayout(self.scroll_content)
-        self.scroll_layout.setContentsMargins(5, 5, 5, 5)
-        self.scroll_layout.setSpacing(5)
-        self.scroll_content.setLayout(self.scroll_layout)
-
-        # Set the scroll content widget to the scroll area
-        self.scroll_area.setWidget(self.scroll_content)
+        # Create and configure the top section (a list view of the hourly forecast rows)
+        # The view only paints the rows that are visible, and the model updates its rows in place on a refresh
+        self.hourly_model = HourlyForecastModel(self)
+        self.list_view = QListView()
+        self.list_view.setModel(self.hourly_model)
+        self.list_view.setItemDelegate(HourlyForecastDelegate(self.list_view))
+        self.list_view.setSelectionMode(QListView.NoSelection)
+        self.list_view.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.list_view.setStyleSheet("QListView { background: palette(window); }")
 
         # Create and configure the bottom section (text area for generated time)
         self.hourly_generated_time = QTextEdit()
@@ -316,161 +377,28 @@ class HourlyForecastTab(QWidget):
         self.hourly_generated_time.setFixedHeight(30)
 
         # Add all sections to the main layout
-        self.hourly_layout.addWidget(self.scroll_area)
+        self.hourly_layout.addWidget(self.list_view)
         self.hourly_layout.addWidget(self.hourly_generated_time)
 
-    def update_data(self, hourly_forecast_generated_time, hourly_forecasts):
-        # Clear existing rows in the scroll area
-        self._clear_forecast_rows()
-
-        forecast_date = ""
+    def update_data(self, hourly_forecast_generated_time, hourly_forecasts, day_index=None):
+        self.update_forecasts(hourly_forecasts, day_index)
 
-        # Add new forecast row to the scroll layout
-        for forecast in hourly_forecasts:
-            row = HourlyForecastRow()
-            row.update_data(forecast)
+        # Update the generated time label
+        self.update_generated_time(hourly_forecast_generated_time)
 
-            if forecast.formatted_date != forecast_date:
-                forecast_date = forecast.formatted_date
-                header_row = HourlyForecastHeaderRow()
-                header_row.update_data(forecast_date)
-                self.scroll_layout.addWidget(header_row)
-            # Connect signal to show extra details
-            # row.showMoreClicked.connect(self.update_detailed_forecast_label)
-            self.scroll_layout.addWidget(row)
+    def update_forecasts(self, hourly_forecasts, day_index=None):
+        # Update the rows of the list view (headers are added for each day by the model,
+        # with a summary of the day if the day index of the forecasts is given)
+        self.hourly_model.set_forecasts(hourly_forecasts, day_index)
 
-        # Update the generated time label
+    def update_generated_time(self, hourly_forecast_generated_time):
+        """Updates the generated time label, e.g. for a new issuance of the same forecast."""
         self.hourly_generated_time.setPlainText(f"Hourly forecast generated at {hourly_forecast_generated_time}")
 
     def clear_data(self):
-        self._clear_forecast_rows()
+        self.hourly_model.clear()
         self.hourly_generated_time.setPlainText("")
 
-    def _clear_forecast_rows(self):
-        """Clears all the rows currently in the scroll layout."""
-        while self.scroll_layout.count():
-            child = self.scroll_layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
-
-
-class HourlyForecastHeaderRow(QLabel):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        heading_font = QFont()
-        heading_font.setPixelSize(20)
-
-        self.setFont(heading_font)
-        self.setText("")
-        self.setContentsMargins(5, 5, 5, 5)
-
-    def update_data(self, date):
-        self.setText(date)
-
-
-class HourlyForecastRow(QFrame):
-    """A row widget to display hourly forecast data."""
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        # Initialize the UI components and set up the layout
-        self.setStyleSheet("""
-            HourlyForecastRow {
-                background-color: white;
-                border-radius: 4px;
-            }
-            QLabel {
-                padding: 4px;
-            }
-        """)
-
-        self.uniform_font = QFont()
-        self.uniform_font.setPixelSize(20)
-
-        self.icon_font = QFont('Segoe UI Emoji')
-        self.icon_font.setPixelSize(20)
-
-        self.is_expanded = False
-
-        # Main row widgets
-        self.hour_label = QLabel("", self)
-        self.icon_label = QLabel("", self)
-        self.rain_label = QLabel("", self)
-        self.temp_label = QLabel("", self)
-        self.wind_label = QLabel("", self)
-        self.show_more_button = QPushButton("+", self)
-
-        # Set fixed widths for consistent spacing
-        self.hour_label.setFixedWidth(110)
-        self.icon_label.setFixedWidth(45)
-        self.rain_label.setFixedWidth(100)
-        self.temp_label.setFixedWidth(70)
-        self.show_more_button.setFixedWidth(30)
-
-        # Details section (initially hidden)
-        self.details_widget = QWidget()
-        self.details_widget.setVisible(False)
-        self.details_layout = QVBoxLayout(self.details_widget)
-        self.details_layout.setSpacing(2)  # Reduced from default
-        self.details_layout.setContentsMargins(0, 0, 0, 0)
-
-        # Detail labels
-        self.detail_short_forecast = QLabel("", self.details_widget)
-        self.detail_short_forecast.setWordWrap(True)
-        self.detail_dewpoint = QLabel("", self.details_widget)
-        self.detail_humidity = QLabel("", self.details_widget)
-
-        # Set fonts
-        for widget in [self.hour_label, self.rain_label, self.temp_label, self.wind_label, self.detail_short_forecast,
-                       self.detail_dewpoint, self.detail_humidity]:
-            widget.setFont(self.uniform_font)
-
-        self.icon_label.setFont(self.icon_font)
-
-        # Main layout setup
-        self.main_layout = QVBoxLayout(self)
-        self.main_layout.setContentsMargins(5, 5, 5, 5)
-        self.main_layout.setSpacing(0)
-
-        # Top row layout
-        self.top_row = QHBoxLayout()
-        self.top_row.setContentsMargins(0, 0, 5, 0)
-
-        # Add widgets
-        for widget in [self.hour_label, self.icon_label, self.rain_label, self.temp_label, self.wind_label,
-                       self.show_more_button]:
-            self.top_row.addWidget(widget)
-
-        for widget in [self.detail_short_forecast, self.detail_dewpoint, self.detail_humidity]:
-            self.details_layout.addWidget(widget)
-
-        # Add to main layout
-        self.main_layout.addLayout(self.top_row)
-        self.main_layout.addWidget(self.details_widget)
-
-        # Connect button
-        self.show_more_button.clicked.connect(self.toggle_details)
-
-    def toggle_details(self):
-        """Toggle the visibility of the details section."""
-        self.is_expanded = not self.is_expanded
-        self.details_widget.setVisible(self.is_expanded)
-        self.show_more_button.setText("-" if self.is_expanded else "+")
-
-    def update_data(self, forecast):
-        """Populate the row with forecast data"""
-        self.hour_label.setText(forecast.forecast_hour)
-        self.icon_label.setText(forecast.weather_icon)
-        self.rain_label.setText(forecast.chance_of_rain)
-        self.temp_label.setText(forecast.temperature_fahrenheit)
-        self.wind_label.setText(forecast.wind)
-
-        self.detail_short_forecast.setText(f"Short Forecast: {forecast.short_forecast}")
-        self.detail_dewpoint.setText(f"Dewpoint: {forecast.dewpoint_fahrenheit}")
-        self.detail_humidity.setText(f"Relative Humidity: {forecast.relative_humidity}")
-
 
 class LocationSearchWidget(QWidget):
     locationConfirmed = pyqtSignal(object)
@@ -479,6 +407,7 @@ class LocationSearchWidget(QWidget):
         """Set up the UI components."""
         super().__init__(parent)
         self.geo_service = GeolocatorService()
+        self.geocode_worker = None
 
         # Configure Font
         font = QFont()
@@ -513,30 +442,39 @@ class LocationSearchWidget(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter a location.")
             return
 
-        location = self.geo_service.get_location(location_text)
+        # A query that was found before is answered from the cache right away
+        location = self.geo_service.get_cached_location(location_text)
+        if location:
+            self.handle_location_found(location_text, location)
+            return
+
+        # Otherwise ask the geocoder in the background; searching is disabled until it answers
+        self._set_searching(True)
+        self.geocode_worker = GeocodeWorker(location_text, self.geo_service)
+        self.geocode_worker.geocode_finished.connect(self.handle_location_found)
+        self.geocode_worker.start()
+
+    def handle_location_found(self, query, location):
+        """Asks the user to confirm a found location and emits a signal if confirmed."""
+        self._set_searching(False)
         if location:
             if self._confirm_location(location.address):
-                self._clear_previous_forecast()
                 self.locationConfirmed.emit(location)
                 self.search_bar.clear()
         else:
             QMessageBox.warning(self, "Location Not Found",
                                 "Could not find the location. Please try a different query.")
 
+    def _set_searching(self, searching):
+        self.search_bar.setEnabled(not searching)
+        self.search_button.setEnabled(not searching)
+        self.search_button.setText("..." if searching else "Search")
+
     def _confirm_location(self, address):
         """Prompt the user to confirm the found location."""
         return QMessageBox.question(self, "Confirm Location", f"Is this the correct location?\n\n{address}",
                                     QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes
 
-    def _clear_previous_forecast(self):
-        """Remove old forecast data files if they exist."""
-        for filename in ['daily_forecast_data.csv', 'hourly_forecast_data.csv']:
-            try:
-                if os.path.exists(filename):
-                    os.remove(filename)
-            except OSError:
-                pass
-
 
 class WeatherMainWindow(QWidget):
     def __init__(self, parent=None):
@@ -560,35 +498,139 @@ class WeatherMainWindow(QWidget):
 
         self.setLayout(layout)
 
+        # The forecasts of the current location are refreshed in the background, a little after the next
+        # forecast is expected to be issued (see RefreshScheduler)
+        self.location = None
+        self.worker = None
+        self.stopping_workers = set()
+        self.refreshing = False
+        # The location (see _location_key()) whose forecasts are shown, None while nothing is shown
+        self.shown_location = None
+        # The hourly forecast shown. Its hours that are over are dropped at the start of every hour, since a
+        # refresh only hands over a new forecast if it changed
+        self.hourly_manager = None
+        self.hour_timer = QTimer(self)
+        self.hour_timer.setSingleShot(True)
+        self.hour_timer.timeout.connect(self.update_current_hour)
+        self.refresh_scheduler = RefreshScheduler()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.refresh_forecast)
+
     def handle_location_confirmed(self, location):
         """Handles the location confirmation event."""
+        self.location = location
         self.heading_widget.update_data(location.address)
+        self._start_worker(refreshing=False)
 
-        # Start forecast worker thread
-        self.worker = ForecastWorker(location)
-        self.worker.worker_finished.connect(self.handle_forecast_result)
-        self.worker.start()
+    def refresh_forecast(self):
+        """Fetches the forecasts of the current location again, keeping the shown ones if that fails."""
+        if self.location is not None:
+            self._start_worker(refreshing=True)
+
+    def handle_forecasts_ready(self, daily_manager, hourly_manager):
+        """Shows the forecasts built by the worker."""
+        if self.sender() is not self.worker:
+            # The forecasts of a worker that has been replaced since
+            return
+        # A forecast served from the HTTP cache can start with hours that are already over. Only the hours shown
+        # are trimmed: the worker saves and archives the whole forecast
+        hourly_manager.trim_expired()
+        daily_forecasts = daily_manager.get_forecasts()
+        hourly_forecasts = hourly_manager.get_forecasts()
+        if daily_forecasts and hourly_forecasts:
+            daily_generated_time = daily_manager.get_generation_time()
+            hourly_generated_time = hourly_manager.get_forecast_generation_time()
+            self.forecast_tabs_widget.update_data(daily_generated_time, hourly_generated_time, daily_forecasts,
+                                                  hourly_forecasts, hourly_manager.get_day_index())
+            self.shown_location = _location_key(self.location)
+            self.hourly_manager = hourly_manager
+            self._show_current_conditions()
+        else:
+            self._clear_forecast()
+
+    def update_current_hour(self):
+        """Drops the hours that are over from the hourly forecast shown and shows the current conditions again."""
+        if self.hourly_manager is None:
+            return
+        if self.hourly_manager.trim_expired():
+            self.forecast_tabs_widget.update_hourly_forecasts(self.hourly_manager.get_forecasts(),
+                                                              self.hourly_manager.get_day_index())
+        self._show_current_conditions()
 
     def handle_forecast_result(self, success, message, daily_generated_time, hourly_generated_time):
-        """Handles the forecast result update."""
+        """Handles the forecast result update and schedules the next refresh."""
         print(message)
+        if self.sender() is not self.worker:
+            # The result of a worker that has been replaced since
+            return
+        location_key = _location_key(self.location)
         if success:
-            daily_manager = DailyForecastManager("daily_forecast_data.csv", daily_generated_time)
-            hourly_manager = HourlyForecastManager("hourly_forecast_data.csv", hourly_generated_time)
-
-            if daily_manager.load_forecasts() and hourly_manager.load_forecasts():
-                daily_forecasts = daily_manager.get_forecasts()
-                hourly_forecasts = hourly_manager.get_forecasts()
-                self.current_weather_widget.update_data(hourly_forecasts[0].temperature_fahrenheit,
-                                                        hourly_forecasts[0].short_forecast)
-                self.forecast_tabs_widget.update_data(daily_generated_time, hourly_generated_time, daily_forecasts,
-                                                      hourly_forecasts)
-            else:
-                self.heading_widget.clear_data()
-                self.current_weather_widget.clear_data()
-                self.forecast_tabs_widget.clear_data()
+            self.refresh_scheduler.record_result(location_key, {"daily": daily_generated_time,
+                                                                "hourly": hourly_generated_time})
+            if self.refreshing:
+                # A refresh whose forecasts didn't change doesn't hand them over again (see skip_unchanged)
+                self.forecast_tabs_widget.update_generated_times(daily_generated_time, hourly_generated_time)
+                self.update_current_hour()
+        else:
+            self.refresh_scheduler.record_failure(location_key)
+            if not self.refreshing:
+                # Data retrieval failed, update UI to show no data
+                self._clear_forecast()
+        self.refresh_timer.start(int(self.refresh_scheduler.seconds_until_next_poll(location_key) * 1000))
+
+    def _start_worker(self, refreshing):
+        # Only one forecast worker runs at a time; a previous one is cancelled and its forecasts are ignored
+        self.refresh_timer.stop()
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.forecasts_ready.disconnect(self.handle_forecasts_ready)
+            # Keep the thread referenced until it stops, it must not be destroyed while running
+            worker = self.worker
+            self.stopping_workers.add(worker)
+            worker.finished.connect(lambda: self.stopping_workers.discard(worker))
+
+        # Start forecast worker thread
+        self.refreshing = refreshing
+        # A refresh only updates the forecasts shown if they changed. The worker compares them with the last ones
+        # fetched for the grid cell, so this only holds if those are the ones shown (not e.g. after a failed search)
+        skip_unchanged = refreshing and self.shown_location == _location_key(self.location)
+        self.worker = ForecastWorker(self.location, skip_unchanged=skip_unchanged)
+        self.worker.forecasts_ready.connect(self.handle_forecasts_ready)
+        self.worker.worker_finished.connect(self.handle_forecast_result)
+        self.worker.start()
+
+    def _show_current_conditions(self):
+        # The current conditions are those of the hour containing now, which needn't be the first one
+        # (e.g. for a forecast served from a cache)
+        current = self.hourly_manager.get_forecast_at()
+        if current is not None:
+            self.current_weather_widget.update_data(current.temperature_fahrenheit, current.short_forecast)
         else:
-            # Data retrieval failed, update UI to show no data
-            self.heading_widget.clear_data()
             self.current_weather_widget.clear_data()
-            self.forecast_tabs_widget.clear_data()
+        # Look again once the next hour has started (the forecast hours start on the hour)
+        self.hour_timer.start(int((_HOUR - time.time() % _HOUR + 1) * 1000))
+
+    def _clear_forecast(self):
+        self.shown_location = None
+        self.hourly_manager = None
+        self.hour_timer.stop()
+        self.heading_widget.clear_data()
+        self.current_weather_widget.clear_data()
+        self.forecast_tabs_widget.clear_data()
+
+
+def _forecast_key(forecast):
+    # Identifies the period of a daily forecast across updates: its start time, or its name if that is missing
+    return forecast.start_time or forecast.period_name
+
+
+def _location_key(location):
+    # Identifies a location for the refresh scheduler
+    return f"{location.latitude:.4f},{location.longitude:.4f}"
+
+
+def _set_text(label, text):
+    # Only sets the text of a label if it changed, so an unchanged label isn't laid out and repainted again
+    if label.text() != text:
+        label.setText(text)
@@ -0,0 +1,107 @@
+"""
+Unit conversion and parsing for forecast values, for a single value or a whole column at once.
+
+The batch functions parse the columns HourlyForecastColumns is built from: they take any iterable and return
+float64 arrays with NaN for a missing value. A forecast column only has a few distinct values (temperatures,
+percentages, units, wind speeds), so each distinct value is parsed once and the column is then filled with
+C level lookups (map() over a dict) instead of a Python call per value.
+"""
+import math
+from array import array
+
+
+#function for converting Fahrenheit to Celsius (takes a float and returns a float)
+def fahrenheit_to_celsius(fahrenheit):
+    celsius = (fahrenheit - 32) * 5 / 9
+    return celsius
+
+
+#function for converting Celsius to Fahrenheit (takes a float and returns a float)
+def celsius_to_fahrenheit(celsius):
+    fahrenheit = (celsius * 9 / 5) + 32
+    return fahrenheit
+
+
+def parse_number(value):
+    """Returns a value (number or string) as a float, or NaN if it is missing or not a number."""
+    if value is None or value == "":
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def unit_letter(unit):
+    """Returns "F" or "C" for temperature units like "F", " c " or "wmoUnit:degC"; None for anything else."""
+    if not unit:
+        return None
+    letter = unit.strip().upper()[-1:]
+    return letter if letter in ("F", "C") else None
+
+
+def parse_wind_speed(text):
+    """
+    Returns the (low, high) speed of a wind speed string: "5 mph" -> (5.0, 5.0), "5 to 10 mph" -> (5.0, 10.0).
+    Both are NaN if there is no number in it.
+    """
+    if not text:
+        return math.nan, math.nan
+    numbers = [float(word) for word in text.split() if word.replace(".", "", 1).isdigit()]
+    if not numbers:
+        return math.nan, math.nan
+    return min(numbers), max(numbers)
+
+
+def parse_numbers(values):
+    """Batch version of parse_number()."""
+    values = values if isinstance(values, list) else list(values)
+    return _column(_parse_each(values, parse_number), values)
+
+
+def temperatures_to_fahrenheit(values, units):
+    """
+    Converts a column of temperatures to Fahrenheit.
+    units is either one unit for the whole column or a column of units (one per value).
+    """
+    if isinstance(units, str) or units is None:
+        convert = _to_fahrenheit(unit_letter(units))
+        values = values if isinstance(values, list) else list(values)
+        return _column(_parse_each(values, convert), values)
+
+    letters = {unit: unit_letter(unit) for unit in dict.fromkeys(units)}
+    if len({letter == "C" for letter in letters.values()}) <= 1:
+        # The API gives every period in the same unit
+        return temperatures_to_fahrenheit(values, next(iter(letters), None))
+
+    # Convert each distinct (value, unit) pair once
+    pairs = list(zip(values, units))
+    converted = {pair: _to_fahrenheit(letters[pair[1]])(pair[0]) for pair in dict.fromkeys(pairs)}
+    return _column(converted, pairs)
+
+
+def parse_wind_speeds(texts):
+    """Batch version of parse_wind_speed(); returns a (low speeds, high speeds) pair of columns."""
+    texts = texts if isinstance(texts, list) else list(texts)
+    parsed = _parse_each(texts, parse_wind_speed)
+    lows = {text: speeds[0] for text, speeds in parsed.items()}
+    highs = {text: speeds[1] for text, speeds in parsed.items()}
+    return _column(lows, texts), _column(highs, texts)
+
+
+def _parse_each(values, parse):
+    # Maps each distinct value of a column to its parsed value
+    return {value: parse(value) for value in dict.fromkeys(values)}
+
+
+def _column(parsed, values):
+    # Looks every value of a column up in a dict of parsed values (a list first: an array is filled faster from it)
+    return array("d", list(map(parsed.__getitem__, values)))
+
+
+def _to_fahrenheit(letter):
+    # The function parsing a temperature in a unit ("F", "C" or None, see unit_letter()) to Fahrenheit.
+    # A missing or unknown unit is taken as Fahrenheit, the unit the API gives temperatures in by default
+    if letter == "C":
+        return lambda value: celsius_to_fahrenheit(parse_number(value))
+    return parse_number